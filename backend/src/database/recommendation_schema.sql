@@ -3,18 +3,26 @@
 
 -- Profile-specific movie recommendation tables
 -- Each profile gets their own table with current recommendations
+-- Scores are fixed-width 4-byte REAL rather than variable-length DECIMAL: narrower rows,
+-- cheaper sorts and aggregates. Existing databases can be converted in place per table:
+--   ALTER TABLE anshul_dash
+--       ALTER COLUMN vote_average TYPE REAL,
+--       ALTER COLUMN popularity TYPE REAL,
+--       ALTER COLUMN similarity_score TYPE REAL;
+-- then DROP FUNCTION get_profile_recommendations(VARCHAR, INTEGER) and re-create it below,
+-- since its result columns change type.
 
 CREATE TABLE anshul_dash (
     id SERIAL PRIMARY KEY,
     tmdb_id INTEGER NOT NULL UNIQUE,
     title VARCHAR(500),
     genres TEXT[],
-    vote_average DECIMAL(3,1),
-    popularity DECIMAL(8,3),
+    vote_average REAL,
+    popularity REAL,
     overview TEXT,
     poster_path VARCHAR(255),
     recommendation_reason TEXT,
-    similarity_score DECIMAL(5,4) DEFAULT 0.5,
+    similarity_score REAL DEFAULT 0.5,
     added_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     is_active BOOLEAN DEFAULT TRUE
 );
@@ -24,12 +32,12 @@ CREATE TABLE shikhar_dash (
     tmdb_id INTEGER NOT NULL UNIQUE,
     title VARCHAR(500),
     genres TEXT[],
-    vote_average DECIMAL(3,1),
-    popularity DECIMAL(8,3),
+    vote_average REAL,
+    popularity REAL,
     overview TEXT,
     poster_path VARCHAR(255),
     recommendation_reason TEXT,
-    similarity_score DECIMAL(5,4) DEFAULT 0.5,
+    similarity_score REAL DEFAULT 0.5,
     added_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     is_active BOOLEAN DEFAULT TRUE
 );
@@ -39,12 +47,12 @@ CREATE TABLE priyanshu_dash (
     tmdb_id INTEGER NOT NULL UNIQUE,
     title VARCHAR(500),
     genres TEXT[],
-    vote_average DECIMAL(3,1),
-    popularity DECIMAL(8,3),
+    vote_average REAL,
+    popularity REAL,
     overview TEXT,
     poster_path VARCHAR(255),
     recommendation_reason TEXT,
-    similarity_score DECIMAL(5,4) DEFAULT 0.5,
+    similarity_score REAL DEFAULT 0.5,
     added_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     is_active BOOLEAN DEFAULT TRUE
 );
@@ -54,12 +62,12 @@ CREATE TABLE shaurya_dash (
     tmdb_id INTEGER NOT NULL UNIQUE,
     title VARCHAR(500),
     genres TEXT[],
-    vote_average DECIMAL(3,1),
-    popularity DECIMAL(8,3),
+    vote_average REAL,
+    popularity REAL,
     overview TEXT,
     poster_path VARCHAR(255),
     recommendation_reason TEXT,
-    similarity_score DECIMAL(5,4) DEFAULT 0.5,
+    similarity_score REAL DEFAULT 0.5,
     added_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     is_active BOOLEAN DEFAULT TRUE
 );
@@ -77,22 +85,38 @@ CREATE TABLE recommendation_sessions (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Last refresh state per profile (hash of watch history, ratings, mood and genres)
+-- lets the recommendation service skip refreshes when nothing has changed
+CREATE TABLE recommendation_state (
+    username VARCHAR(50) PRIMARY KEY,
+    state_hash BYTEA NOT NULL,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes for better performance
 CREATE INDEX idx_anshul_dash_tmdb_id ON anshul_dash(tmdb_id);
 CREATE INDEX idx_anshul_dash_similarity_score ON anshul_dash(similarity_score DESC);
 CREATE INDEX idx_anshul_dash_active ON anshul_dash(is_active);
+CREATE INDEX idx_anshul_dash_active_score ON anshul_dash(similarity_score DESC, added_at DESC) WHERE is_active = TRUE;
+CREATE INDEX idx_anshul_dash_genres ON anshul_dash USING GIN (genres);
 
 CREATE INDEX idx_shikhar_dash_tmdb_id ON shikhar_dash(tmdb_id);
 CREATE INDEX idx_shikhar_dash_similarity_score ON shikhar_dash(similarity_score DESC);
 CREATE INDEX idx_shikhar_dash_active ON shikhar_dash(is_active);
+CREATE INDEX idx_shikhar_dash_active_score ON shikhar_dash(similarity_score DESC, added_at DESC) WHERE is_active = TRUE;
+CREATE INDEX idx_shikhar_dash_genres ON shikhar_dash USING GIN (genres);
 
 CREATE INDEX idx_priyanshu_dash_tmdb_id ON priyanshu_dash(tmdb_id);
 CREATE INDEX idx_priyanshu_dash_similarity_score ON priyanshu_dash(similarity_score DESC);
 CREATE INDEX idx_priyanshu_dash_active ON priyanshu_dash(is_active);
+CREATE INDEX idx_priyanshu_dash_active_score ON priyanshu_dash(similarity_score DESC, added_at DESC) WHERE is_active = TRUE;
+CREATE INDEX idx_priyanshu_dash_genres ON priyanshu_dash USING GIN (genres);
 
 CREATE INDEX idx_shaurya_dash_tmdb_id ON shaurya_dash(tmdb_id);
 CREATE INDEX idx_shaurya_dash_similarity_score ON shaurya_dash(similarity_score DESC);
 CREATE INDEX idx_shaurya_dash_active ON shaurya_dash(is_active);
+CREATE INDEX idx_shaurya_dash_active_score ON shaurya_dash(similarity_score DESC, added_at DESC) WHERE is_active = TRUE;
+CREATE INDEX idx_shaurya_dash_genres ON shaurya_dash USING GIN (genres);
 
 CREATE INDEX idx_recommendation_sessions_user_id ON recommendation_sessions(user_id);
 CREATE INDEX idx_recommendation_sessions_profile ON recommendation_sessions(profile_name);
@@ -238,11 +262,11 @@ RETURNS TABLE (
     tmdb_id INTEGER,
     title VARCHAR(500),
     genres TEXT[],
-    vote_average DECIMAL(3,1),
-    popularity DECIMAL(8,3),
+    vote_average REAL,
+    popularity REAL,
     overview TEXT,
     poster_path VARCHAR(255),
-    similarity_score DECIMAL(5,4)
+    similarity_score REAL
 ) AS $$
 BEGIN
     CASE profile_name
@@ -305,11 +329,11 @@ BEGIN
                     (rec->>'tmdb_id')::INTEGER,
                     rec->>'title',
                     ARRAY(SELECT jsonb_array_elements_text(rec->'genres')),
-                    (rec->>'vote_average')::DECIMAL(3,1),
-                    (rec->>'popularity')::DECIMAL(8,3),
+                    (rec->>'vote_average')::REAL,
+                    (rec->>'popularity')::REAL,
                     rec->>'overview',
                     rec->>'poster_path',
-                    COALESCE((rec->>'similarity_score')::DECIMAL(5,4), 0.5),
+                    COALESCE((rec->>'similarity_score')::REAL, 0.5),
                     COALESCE(rec->>'recommendation_reason', 'Generated by recommendation engine')
                 );
             WHEN 'shikhar' THEN
@@ -319,11 +343,11 @@ BEGIN
                     (rec->>'tmdb_id')::INTEGER,
                     rec->>'title',
                     ARRAY(SELECT jsonb_array_elements_text(rec->'genres')),
-                    (rec->>'vote_average')::DECIMAL(3,1),
-                    (rec->>'popularity')::DECIMAL(8,3),
+                    (rec->>'vote_average')::REAL,
+                    (rec->>'popularity')::REAL,
                     rec->>'overview',
                     rec->>'poster_path',
-                    COALESCE((rec->>'similarity_score')::DECIMAL(5,4), 0.5),
+                    COALESCE((rec->>'similarity_score')::REAL, 0.5),
                     COALESCE(rec->>'recommendation_reason', 'Generated by recommendation engine')
                 );
             WHEN 'priyanshu' THEN
@@ -333,11 +357,11 @@ BEGIN
                     (rec->>'tmdb_id')::INTEGER,
                     rec->>'title',
                     ARRAY(SELECT jsonb_array_elements_text(rec->'genres')),
-                    (rec->>'vote_average')::DECIMAL(3,1),
-                    (rec->>'popularity')::DECIMAL(8,3),
+                    (rec->>'vote_average')::REAL,
+                    (rec->>'popularity')::REAL,
                     rec->>'overview',
                     rec->>'poster_path',
-                    COALESCE((rec->>'similarity_score')::DECIMAL(5,4), 0.5),
+                    COALESCE((rec->>'similarity_score')::REAL, 0.5),
                     COALESCE(rec->>'recommendation_reason', 'Generated by recommendation engine')
                 );
             WHEN 'shaurya' THEN
@@ -347,11 +371,11 @@ BEGIN
                     (rec->>'tmdb_id')::INTEGER,
                     rec->>'title',
                     ARRAY(SELECT jsonb_array_elements_text(rec->'genres')),
-                    (rec->>'vote_average')::DECIMAL(3,1),
-                    (rec->>'popularity')::DECIMAL(8,3),
+                    (rec->>'vote_average')::REAL,
+                    (rec->>'popularity')::REAL,
                     rec->>'overview',
                     rec->>'poster_path',
-                    COALESCE((rec->>'similarity_score')::DECIMAL(5,4), 0.5),
+                    COALESCE((rec->>'similarity_score')::REAL, 0.5),
                     COALESCE(rec->>'recommendation_reason', 'Generated by recommendation engine')
                 );
         END CASE;
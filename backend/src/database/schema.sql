@@ -44,6 +44,7 @@ CREATE TABLE mood_selections (
 CREATE INDEX idx_mood_selections_user_id ON mood_selections(user_id);
 CREATE INDEX idx_mood_selections_selected_at ON mood_selections(selected_at);
 CREATE INDEX idx_mood_selections_page ON mood_selections(page);
+CREATE INDEX idx_mood_user_time ON mood_selections(user_id, selected_at DESC);
 
 -- Note: Daily uniqueness will be enforced in application logic
 -- PostgreSQL doesn't allow non-immutable functions in unique indexes
@@ -69,6 +70,7 @@ CREATE INDEX idx_watched_movies_tmdb_id ON watched_movies(tmdb_id);
 CREATE INDEX idx_watched_movies_watched_at ON watched_movies(watched_at);
 CREATE INDEX idx_watched_movies_rating ON watched_movies(rating);
 CREATE INDEX idx_watched_movies_current_mood ON watched_movies(current_mood);
+CREATE INDEX idx_watched_user_time ON watched_movies(user_id, watched_at DESC);
 
 -- Create function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
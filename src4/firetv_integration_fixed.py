@@ -11,42 +11,506 @@ import sys
 import json
 import psycopg2
 import psycopg2.extras
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 import random
 import time
-import pickle
+import sqlite3
 import hashlib
+import threading
+import atexit
 from pathlib import Path
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-from collections import Counter, defaultdict
-from scipy.stats import pearsonr
-from sklearn.metrics.pairwise import cosine_similarity
-import torch
-
-# Enhanced imports for advanced recommendations
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from collections import defaultdict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import importlib
+import importlib.util
+
+if TYPE_CHECKING:
+    # Only for annotations; scipy is imported lazily where the matrices are built
+    from scipy.sparse import csc_matrix, csr_matrix
+
+# Optional HTTP/2 client for TMDB (pip install 'httpx[http2]'); falls back to requests
 try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
+    import httpx
+    HTTPX_AVAILABLE = True
 except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
-    print("⚠️  SentenceTransformers not available. Install with: pip install sentence-transformers")
+    HTTPX_AVAILABLE = False
 
+# Optional faster JSON for the cache store (pip install orjson); falls back to json
 try:
-    import torch
-    TORCH_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    TORCH_AVAILABLE = False
+    ORJSON_AVAILABLE = False
+
+# Enhanced imports for advanced recommendations. torch and sentence_transformers are
+# heavy, so only check they're installed here; they're imported on first use.
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec('sentence_transformers') is not None
+if not SENTENCE_TRANSFORMERS_AVAILABLE:
+    print("⚠️  SentenceTransformers not available. Install with: pip install sentence-transformers")
+
+TORCH_AVAILABLE = importlib.util.find_spec('torch') is not None
+if not TORCH_AVAILABLE:
     print("⚠️  PyTorch not available. Install with: pip install torch")
 
+# ONNX Runtime backend for sentence-transformers (CPU only; needs optimum[onnxruntime])
+ONNX_AVAILABLE = (importlib.util.find_spec('onnxruntime') is not None
+                  and importlib.util.find_spec('optimum') is not None)
+
+# Dynamically quantized (int8) export shipped with all-MiniLM-L6-v2
+ONNX_MODEL_FILE = "onnx/model_quint8_avx2.onnx"
+
+torch = None
+SentenceTransformer = None
+
+def _load_ml_modules():
+    """Import torch and SentenceTransformer on first use"""
+    global torch, SentenceTransformer
+    if torch is None and TORCH_AVAILABLE:
+        torch = importlib.import_module('torch')
+    if SentenceTransformer is None and SENTENCE_TRANSFORMERS_AVAILABLE:
+        SentenceTransformer = importlib.import_module('sentence_transformers').SentenceTransformer
+
 # Set UTF-8 encoding for Windows console
 if sys.platform.startswith('win'):
     sys.stdout.reconfigure(encoding='utf-8')
     sys.stderr.reconfigure(encoding='utf-8')
 
+# TMDB fetch concurrency (kept under TMDB's per-IP simultaneous connection cap)
+TMDB_MAX_WORKERS = 10
+TMDB_POOL_SIZE = 20
+
+# PostgreSQL connection pool bounds
+DB_POOL_MIN_CONN = 2
+DB_POOL_MAX_CONN = 10
+RATING_FETCH_BATCH = 10000  # rows per round-trip when streaming the rating matrix
+
+def _pg_text_array(values: List[str]) -> str:
+    """Encode a list of strings as a Postgres text[] literal"""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in values)
+    return '{' + ','.join(f'"{value}"' for value in escaped) + '}'
+
+def _to_float(value, default: float) -> float:
+    """Native float for a DB parameter; float() also unwraps numpy scalars"""
+    return default if value is None else float(value)
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first; same result as a stable full argsort (ties keep input order)"""
+    if len(scores) <= k:
+        return np.argsort(-scores, kind='stable')
+    
+    # O(n) selection: everything above the k-th best score, plus the earliest ties at it
+    kth_best = np.partition(scores, len(scores) - k)[len(scores) - k]
+    above = np.flatnonzero(scores > kth_best)
+    ties = np.flatnonzero(scores == kth_best)[:k - len(above)]
+    selected = np.concatenate([above, ties])
+    return selected[np.argsort(-scores[selected], kind='stable')]
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which server-side statements it has prepared"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+# Hot per-user query, prepared once per pooled connection: history, ratings and
+# latest mood are aggregated server-side so a profile load is one small row
+PREPARED_QUERIES = {
+    'get_user_data': """
+        WITH w AS (
+            SELECT array_agg(tmdb_id ORDER BY watched_at DESC) AS history,
+                   jsonb_object_agg(
+                       tmdb_id::text,
+                       CASE rating
+                           WHEN 'disliked' THEN 3.0
+                           WHEN 'good' THEN 7.0
+                           WHEN 'loved' THEN 9.0
+                           ELSE 5.0
+                       END
+                   ) FILTER (WHERE rating IS NOT NULL) AS ratings,
+                   COUNT(*) AS total
+            FROM watched_movies 
+            WHERE user_id = $1
+        ),
+        m AS (
+            SELECT mood FROM mood_selections 
+            WHERE user_id = $1 
+            ORDER BY selected_at DESC 
+            LIMIT 1
+        )
+        SELECT w.history, w.ratings, w.total, (SELECT mood FROM m) AS mood
+        FROM w
+    """
+}
+
+# Upper bound on candidates scored per request
+MAX_CANDIDATES = 1000
+
+# Profile username -> watched_movies.user_id
+USER_ID_MAP = {'anshul': 1, 'shikhar': 2, 'priyanshu': 3, 'shaurya': 4}
+
+# TMDB genre name -> id mapping
+GENRE_ID_MAP = {
+    'Action': 28, 'Adventure': 12, 'Animation': 16, 'Comedy': 35,
+    'Crime': 80, 'Documentary': 99, 'Drama': 18, 'Family': 10751,
+    'Fantasy': 14, 'History': 36, 'Horror': 27, 'Music': 10402,
+    'Mystery': 9648, 'Romance': 10749, 'Science Fiction': 878,
+    'Thriller': 53, 'War': 10752, 'Western': 37, 'TV Movie': 10770
+}
+GENRE_NAME_BY_ID = {genre_id: name for name, genre_id in GENRE_ID_MAP.items()}
+
+# One bit per known genre, so genre overlap is a popcount of two ints
+GENRE_BITS = {name: 1 << bit for bit, name in enumerate(GENRE_ID_MAP)}
+GENRE_BIT_SHIFTS = np.arange(len(GENRE_BITS), dtype=np.int64)
+
+def _genre_mask(genres) -> int:
+    """Bitmask of the known genres in a list of genre names"""
+    mask = 0
+    for genre in genres:
+        mask |= GENRE_BITS.get(genre, 0)
+    return mask
+
+def _movie_genre_mask(movie: Dict) -> int:
+    """Candidate genre bitmask, precomputed when the candidate was built where possible"""
+    mask = movie.get('_genre_mask')
+    return _genre_mask(movie.get('genres', [])) if mask is None else mask
+
+def _genre_overlaps(masks: np.ndarray, genre_mask: int) -> np.ndarray:
+    """Per-candidate count of genres shared with ``genre_mask``, given the candidates' genre bitmasks
+    
+    Expands the masks into an [N, n_genres] 0/1 membership matrix and reduces it in one pass,
+    i.e. the candidate-genre matrix times the favourite-genre indicator vector.
+    """
+    membership = ((masks & genre_mask)[:, None] >> GENRE_BIT_SHIFTS) & 1
+    return membership.sum(axis=1)
+
+def _movie_text(movie: Dict) -> str:
+    """Text embedded for content similarity, precomputed when the candidate was built where possible"""
+    text = movie.get('_text')
+    return f"{movie['title']}. {movie.get('overview', '')}" if text is None else text
+
+# Curated high-quality movies per genre, used to guarantee candidates when TMDB is unavailable.
+# Shared across calls, so treat the movie dicts as read-only.
+FALLBACK_MOVIES_BY_GENRE = {
+    'Action': (
+        {'tmdb_id': 550, 'title': 'Fight Club', 'genres': ['Action', 'Drama'], 'vote_average': 8.4, 'popularity': 95.2, 'overview': 'An insomniac office worker and a soap salesman form an underground fight club.', 'release_date': '1999-10-15', 'poster_path': '/a26cQPRhJPX6GbWfQbvZdrrp9j9.jpg', 'runtime': 139},
+        {'tmdb_id': 155, 'title': 'The Dark Knight', 'genres': ['Action', 'Crime', 'Drama'], 'vote_average': 9.0, 'popularity': 98.5, 'overview': 'When the menace known as the Joker wreaks havoc on Gotham, Batman must accept one of the greatest psychological and physical tests.', 'release_date': '2008-07-18', 'poster_path': '/qJ2tW6WMUDux911r6m7haRef0WH.jpg', 'runtime': 152},
+        {'tmdb_id': 603, 'title': 'The Matrix', 'genres': ['Action', 'Science Fiction'], 'vote_average': 8.7, 'popularity': 93.8, 'overview': 'A computer hacker learns from mysterious rebels about the true nature of his reality.', 'release_date': '1999-03-30', 'poster_path': '/f89U3ADr1oiB1s9GkdPOEpXUk5H.jpg', 'runtime': 136},
+        {'tmdb_id': 680, 'title': 'Pulp Fiction', 'genres': ['Crime', 'Drama'], 'vote_average': 8.5, 'popularity': 92.1, 'overview': 'The lives of two mob hitmen, a boxer, a gangster and his wife intertwine in four tales of violence and redemption.', 'release_date': '1994-10-14', 'poster_path': '/d5iIlFn5s0ImszYzBPb8JPIfbXD.jpg', 'runtime': 154},
+        {'tmdb_id': 27205, 'title': 'Inception', 'genres': ['Action', 'Science Fiction', 'Thriller'], 'vote_average': 8.4, 'popularity': 87.9, 'overview': 'Dom Cobb is a skilled thief, the absolute best in the dangerous art of extraction.', 'release_date': '2010-07-16', 'poster_path': '/9gk7adHYeDvHkCSEqAvQNLV5Uge.jpg', 'runtime': 148}
+    ),
+    'Comedy': (
+        {'tmdb_id': 13, 'title': 'Forrest Gump', 'genres': ['Comedy', 'Drama'], 'vote_average': 8.5, 'popularity': 89.3, 'overview': 'The presidencies of Kennedy and Johnson, Vietnam, Watergate, and other history unfold through the perspective of an Alabama man.', 'release_date': '1994-07-06', 'poster_path': '/arw2vcBveWOVZr6pxd9XTd1TdQa.jpg', 'runtime': 142},
+        {'tmdb_id': 19995, 'title': 'Avatar', 'genres': ['Action', 'Adventure', 'Fantasy'], 'vote_average': 7.6, 'popularity': 87.4, 'overview': 'In the 22nd century, a paraplegic Marine is dispatched to the moon Pandora on a unique mission.', 'release_date': '2009-12-18', 'poster_path': '/6EiRUJpuoeQPghrs3YNktfnqOVh.jpg', 'runtime': 162}
+    ),
+    'Horror': (
+        {'tmdb_id': 694, 'title': 'The Shining', 'genres': ['Horror', 'Thriller'], 'vote_average': 8.2, 'popularity': 78.9, 'overview': 'A family heads to an isolated hotel for the winter where an evil presence influences the father.', 'release_date': '1980-05-23', 'poster_path': '/b6ko0IKC8MdYBBPkkA1aBPLe2yz.jpg', 'runtime': 146},
+        {'tmdb_id': 539, 'title': 'Psycho', 'genres': ['Horror', 'Mystery', 'Thriller'], 'vote_average': 8.4, 'popularity': 75.2, 'overview': 'A Phoenix secretary embezzles money and goes on the run.', 'release_date': '1960-09-08', 'poster_path': '/yz4QVqPx3h1hD1DfqqQkCq3rmxW.jpg', 'runtime': 109}
+    ),
+    'Science Fiction': (
+        {'tmdb_id': 11, 'title': 'Star Wars', 'genres': ['Adventure', 'Action', 'Science Fiction'], 'vote_average': 8.6, 'popularity': 89.1, 'overview': 'Luke Skywalker joins forces with a Jedi Knight to rescue Princess Leia from the evil Galactic Empire.', 'release_date': '1977-05-25', 'poster_path': '/6FfCtAuVAW8XJjZ7eWeLibRLWTw.jpg', 'runtime': 121},
+    ),
+    'Drama': (
+        {'tmdb_id': 278, 'title': 'The Shawshank Redemption', 'genres': ['Drama'], 'vote_average': 9.3, 'popularity': 96.7, 'overview': 'Two imprisoned men bond over years, finding solace and eventual redemption through acts of common decency.', 'release_date': '1994-09-23', 'poster_path': '/q6y0Go1tsGEsmtFryDOJo3dEmqu.jpg', 'runtime': 142},
+        {'tmdb_id': 238, 'title': 'The Godfather', 'genres': ['Crime', 'Drama'], 'vote_average': 9.2, 'popularity': 91.7, 'overview': 'The aging patriarch of an organized crime dynasty transfers control to his reluctant son.', 'release_date': '1972-03-14', 'poster_path': '/3bhkrj58Vtu7enYsRolD1fZdja1.jpg', 'runtime': 175},
+        {'tmdb_id': 240, 'title': 'The Godfather: Part II', 'genres': ['Crime', 'Drama'], 'vote_average': 9.0, 'popularity': 88.9, 'overview': 'The early life and career of Vito Corleone in 1920s New York City is portrayed.', 'release_date': '1974-12-20', 'poster_path': '/hek3koDUyRQk7FIhPXsa6mT2Zc3.jpg', 'runtime': 202}
+    )
+}
+
+# Last-resort candidates when neither TMDB nor the genre fallbacks produced anything (read-only, like the above)
+EMERGENCY_FALLBACK_MOVIES = (
+    {'tmdb_id': 278, 'title': 'The Shawshank Redemption', 'genres': ['Drama'], 'vote_average': 9.3, 'popularity': 96.7, 'overview': 'Two imprisoned men bond over years, finding solace and eventual redemption through acts of common decency.', 'release_date': '1994-09-23', 'poster_path': '/q6y0Go1tsGEsmtFryDOJo3dEmqu.jpg', 'runtime': 142},
+    {'tmdb_id': 238, 'title': 'The Godfather', 'genres': ['Crime', 'Drama'], 'vote_average': 9.2, 'popularity': 91.7, 'overview': 'The aging patriarch of an organized crime dynasty transfers control to his reluctant son.', 'release_date': '1972-03-14', 'poster_path': '/3bhkrj58Vtu7enYsRolD1fZdja1.jpg', 'runtime': 175},
+    {'tmdb_id': 155, 'title': 'The Dark Knight', 'genres': ['Action', 'Crime', 'Drama'], 'vote_average': 9.0, 'popularity': 98.5, 'overview': 'When the menace known as the Joker wreaks havoc on Gotham, Batman must accept one of the greatest psychological and physical tests.', 'release_date': '2008-07-18', 'poster_path': '/qJ2tW6WMUDux911r6m7haRef0WH.jpg', 'runtime': 152},
+    {'tmdb_id': 603, 'title': 'The Matrix', 'genres': ['Action', 'Science Fiction'], 'vote_average': 8.7, 'popularity': 93.8, 'overview': 'A computer hacker learns from mysterious rebels about the true nature of his reality.', 'release_date': '1999-03-30', 'poster_path': '/f89U3ADr1oiB1s9GkdPOEpXUk5H.jpg', 'runtime': 136},
+    {'tmdb_id': 13, 'title': 'Forrest Gump', 'genres': ['Comedy', 'Drama'], 'vote_average': 8.5, 'popularity': 89.3, 'overview': 'The presidencies of Kennedy and Johnson, Vietnam, Watergate, and other history unfold through the perspective of an Alabama man.', 'release_date': '1994-07-06', 'poster_path': '/arw2vcBveWOVZr6pxd9XTd1TdQa.jpg', 'runtime': 142}
+)
+for _movies in (*FALLBACK_MOVIES_BY_GENRE.values(), EMERGENCY_FALLBACK_MOVIES):
+    for _movie in _movies:
+        _movie['_genre_mask'] = _genre_mask(_movie['genres'])
+        _movie['_text'] = _movie_text(_movie)
+del _movies, _movie
+
+# TMDB response cache lifetimes in seconds; expired entries keep their ETag for cheap revalidation
+TMDB_MOVIE_TTL = timedelta(days=7).total_seconds()
+TMDB_TRENDING_TTL = timedelta(hours=6).total_seconds()
+TMDB_ETAG_RETENTION = timedelta(days=30).total_seconds()
+
+# Cached user data is refreshed more often than everything else
+USER_DATA_TTL = timedelta(hours=1).total_seconds()
+CF_READINESS_TTL = 30  # seconds; global rating counts rarely flip between requests
+
+# TMDB request rate (requests/second), burst size and max retries (429 or transient 5xx) per request.
+# Shared by every worker thread; override for stricter keys, e.g. TMDB_RATE_LIMIT=4 TMDB_BURST=40 for 40 per 10s
+TMDB_RATE_LIMIT = float(os.getenv('TMDB_RATE_LIMIT', '40'))
+if not TMDB_RATE_LIMIT > 0:
+    raise ValueError(f"TMDB_RATE_LIMIT must be a positive number of requests/second, got {TMDB_RATE_LIMIT}")
+# At least one token, or the bucket could never hand one out (e.g. TMDB_RATE_LIMIT=0.5 with the default burst)
+TMDB_BURST = max(1, int(os.getenv('TMDB_BURST', str(int(TMDB_RATE_LIMIT)))))
+TMDB_MAX_RETRIES = 3
+TMDB_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+TMDB_BACKOFF_SECONDS = 0.5  # doubled on every 5xx retry
+
+# Upper bounds on persisted cache entries; the oldest entries are evicted past these
+CACHE_MAX_ENTRIES = {
+    'tmdb': 50_000,
+    'embedding': 200_000,
+    'similarity': 100_000,
+    'user_data': 100
+}
+
+# Seconds between background cache flushes (a final flush also runs at exit)
+CACHE_FLUSH_INTERVAL = 300
+
+# Cached embeddings are held at half precision until saved, then persisted as int8 with a
+# per-vector scale; similarity math upcasts to float32
+EMBEDDING_DTYPE = np.float16
+
+class TokenBucket:
+    """Thread-safe token bucket used to pace outgoing TMDB requests"""
+    
+    def __init__(self, rate: float, capacity: int):
+        if not rate > 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.rate = rate
+        # Below one token acquire() would wait forever
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait = (1 - self.tokens) / self.rate
+            
+            time.sleep(wait)
+
+
+class SQLiteCacheTable(MutableMapping):
+    """Dict-like cache table in SQLite; entries are {'data', 'timestamp', ...} dicts stored as JSON"""
+    
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock, table: str):
+        self.conn = conn
+        self.lock = lock
+        self.table = table
+        with self.lock:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, entry TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+    
+    @staticmethod
+    def _json_default(value):
+        # numpy scalars/arrays and sets are stored as their plain-JSON equivalents
+        if isinstance(value, (np.generic, np.ndarray)):
+            return value.tolist()
+        if isinstance(value, (set, frozenset)):
+            return sorted(value)
+        return str(value)
+    
+    @staticmethod
+    def _decode(entry_json: str, ts: float) -> Dict:
+        entry = orjson.loads(entry_json) if ORJSON_AVAILABLE else json.loads(entry_json)
+        entry['timestamp'] = ts
+        return entry
+    
+    def __getitem__(self, key) -> Dict:
+        with self.lock:
+            row = self.conn.execute(f"SELECT entry, ts FROM {self.table} WHERE key = ?", (str(key),)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return self._decode(*row)
+    
+    def __setitem__(self, key, entry: Dict):
+        payload = {k: v for k, v in entry.items() if k != 'timestamp'}
+        if ORJSON_AVAILABLE:
+            entry_json = orjson.dumps(
+                payload, default=self._json_default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            )
+        else:
+            entry_json = json.dumps(payload, default=self._json_default)
+        with self.lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, entry, ts) VALUES (?, ?, ?)",
+                (str(key), entry_json, entry['timestamp'])
+            )
+    
+    def __delitem__(self, key):
+        with self.lock:
+            cursor = self.conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (str(key),))
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+    
+    def __iter__(self):
+        with self.lock:
+            keys = [row[0] for row in self.conn.execute(f"SELECT key FROM {self.table}")]
+        return iter(keys)
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+    
+    def trim(self, max_entries: int):
+        """Evict the oldest entries beyond max_entries"""
+        with self.lock:
+            self.conn.execute(
+                f"DELETE FROM {self.table} WHERE key NOT IN "
+                f"(SELECT key FROM {self.table} ORDER BY ts DESC LIMIT ?)",
+                (max_entries,)
+            )
+    
+    def items(self):
+        """Decode every entry in one query instead of one lookup per key"""
+        with self.lock:
+            rows = self.conn.execute(f"SELECT key, entry, ts FROM {self.table}").fetchall()
+        return [(key, self._decode(entry_json, ts)) for key, entry_json, ts in rows]
+
+class EmbeddingStore(MutableMapping):
+    """Embedding cache persisted as one memory-mapped int8 .npy matrix plus a JSON key -> (row, ts, scale) index"""
+    
+    def __init__(self, index_file: Path):
+        self.index_file = index_file
+        self.matrix_file = None
+        self.matrix = None
+        self.rows = {}      # key -> (row, timestamp, scale) in the memory-mapped matrix
+        self.pending = {}   # key -> entry added since the last save
+        self.dirty = False
+        self.lock = threading.Lock()
+        
+        if index_file.exists():
+            try:
+                with open(index_file, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                self.matrix_file = index_file.parent / index['matrix']
+                self.matrix = np.load(self.matrix_file, mmap_mode='r')
+                if self.matrix.dtype != np.int8:
+                    raise ValueError("embedding matrix predates int8 storage, starting a fresh store")
+                self.rows = {key: tuple(value) for key, value in index['rows'].items()}
+            except Exception as e:
+                print(f"⚠️ Error loading embedding store: {e}")
+                self.matrix_file, self.matrix, self.rows = None, None, {}
+    
+    def __getitem__(self, key) -> Dict:
+        key = str(key)
+        # save() swaps rows and matrix together (also from the flush timer thread); read both under the lock
+        with self.lock:
+            if key in self.pending:
+                return self.pending[key]
+            row, ts, scale = self.rows[key]
+            # Dequantize the one row read from the memory-mapped matrix
+            return {'data': self.matrix[row].astype(np.float32) * scale, 'timestamp': ts}
+    
+    def __setitem__(self, key, entry: Dict):
+        key = str(key)
+        entry = dict(entry, data=np.asarray(entry['data'], dtype=EMBEDDING_DTYPE))
+        with self.lock:
+            self.pending[key] = entry
+            if self.rows.pop(key, None) is not None:
+                self.dirty = True
+    
+    def __delitem__(self, key):
+        key = str(key)
+        with self.lock:
+            if key in self.pending:
+                del self.pending[key]
+            else:
+                del self.rows[key]
+                self.dirty = True
+    
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.rows) + list(self.pending))
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.rows) + len(self.pending)
+    
+    def trim(self, max_entries: int):
+        """Evict the oldest entries beyond max_entries"""
+        with self.lock:
+            stamps = [(value[1], key) for key, value in self.rows.items()]
+            stamps += [(entry['timestamp'], key) for key, entry in self.pending.items()]
+            if len(stamps) <= max_entries:
+                return
+            stamps.sort(reverse=True)
+            for _, key in stamps[max_entries:]:
+                if self.pending.pop(key, None) is None:
+                    del self.rows[key]
+                    self.dirty = True
+    
+    @staticmethod
+    def _quantize(vector: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Symmetric int8 quantization with one scale per vector"""
+        vector = np.asarray(vector, dtype=np.float32)
+        scale = float(np.abs(vector).max()) / 127.0 or 1.0
+        return np.round(vector / scale).astype(np.int8), scale
+    
+    def save(self):
+        """Write live embeddings to a new matrix generation and point the index at it"""
+        with self.lock:
+            if not self.pending and not self.dirty:
+                return
+            
+            # Saved rows are already quantized; only pending entries need quantizing
+            keys, vectors, stamps, scales = [], [], [], []
+            for key, (row, ts, scale) in self.rows.items():
+                keys.append(key)
+                vectors.append(self.matrix[row])
+                stamps.append(ts)
+                scales.append(scale)
+            for key, entry in self.pending.items():
+                quantized, scale = self._quantize(entry['data'])
+                keys.append(key)
+                vectors.append(quantized)
+                stamps.append(entry['timestamp'])
+                scales.append(scale)
+            
+            # A new file per generation: the old one may still be mapped (and can't be replaced on Windows)
+            generation = int(time.time() * 1000)
+            matrix_file = self.index_file.parent / f"embeddings_{generation}.npy"
+            if vectors:
+                np.save(matrix_file, np.stack(vectors))
+            
+            index = {
+                'matrix': matrix_file.name,
+                'rows': {key: [row, ts, scale] for row, (key, ts, scale) in enumerate(zip(keys, stamps, scales))}
+            }
+            tmp_index = self.index_file.with_suffix('.tmp')
+            with open(tmp_index, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            os.replace(tmp_index, self.index_file)
+            
+            old_matrix_file = self.matrix_file
+            self.matrix_file = matrix_file
+            self.matrix = np.load(matrix_file, mmap_mode='r') if vectors else None
+            self.rows = {key: tuple(value) for key, value in index['rows'].items()}
+            self.pending = {}
+            self.dirty = False
+            
+            if old_matrix_file is not None:
+                try:
+                    old_matrix_file.unlink()
+                except OSError:
+                    pass  # Still mapped elsewhere; a later save cleans it up
+
 class CacheManager:
     """Comprehensive caching system for faster computation"""
     
@@ -54,202 +518,280 @@ class CacheManager:
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         self.ttl = timedelta(hours=ttl_hours)
+        self.ttl_seconds = self.ttl.total_seconds()
         
-        # In-memory caches for frequently accessed data
+        # Persistent caches: TMDB/similarity/user data in SQLite, embeddings in a memory-mapped matrix
         self.memory_cache = {}
-        self.tmdb_cache = {}
-        self.embedding_cache = {}
-        self.similarity_cache = {}
-        self.user_data_cache = {}
+        self.db_file = self.cache_dir / "cache.sqlite3"
+        self.embedding_index_file = self.cache_dir / "embeddings_index.json"
+        
+        # Built on first use by _get_user_emb_index
+        self._user_emb_index = None
         
-        # Cache file paths
-        self.tmdb_cache_file = self.cache_dir / "tmdb_cache.pkl"
-        self.embedding_cache_file = self.cache_dir / "embedding_cache.pkl"
-        self.similarity_cache_file = self.cache_dir / "similarity_cache.pkl"
-        self.user_data_cache_file = self.cache_dir / "user_data_cache.pkl"
+        # Encode batch size (raised when the model runs on a GPU)
+        self.embedding_batch_size = 64
+        
+        # Shared HTTP session so concurrent TMDB calls reuse connections
+        self.session = self._create_http_session()
+        self._bucket = TokenBucket(rate=TMDB_RATE_LIMIT, capacity=TMDB_BURST)
         
         # Load existing caches
         self._load_caches()
         
+        # Flush periodically and at interpreter exit rather than relying on __del__
+        atexit.register(self._save_caches)
+        self._schedule_flush()
+        
         print(f"💾 Cache Manager initialized with TTL: {ttl_hours}h")
     
+    def _create_http_session(self):
+        """HTTP/2 httpx client when available (requests multiplex over few connections), else a pooled requests session"""
+        if HTTPX_AVAILABLE:
+            try:
+                return httpx.Client(http2=True, limits=httpx.Limits(max_connections=TMDB_POOL_SIZE))
+            except ImportError:
+                # httpx installed without the h2 extra
+                pass
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=TMDB_POOL_SIZE, pool_maxsize=TMDB_POOL_SIZE)
+        session.mount('https://', adapter)
+        return session
+    
     def _load_caches(self):
-        """Load caches from disk"""
-        try:
-            if self.tmdb_cache_file.exists():
-                with open(self.tmdb_cache_file, 'rb') as f:
-                    self.tmdb_cache = pickle.load(f)
-                print(f"📁 Loaded {len(self.tmdb_cache)} TMDB cache entries")
-            
-            if self.embedding_cache_file.exists():
-                with open(self.embedding_cache_file, 'rb') as f:
-                    self.embedding_cache = pickle.load(f)
-                print(f"🧠 Loaded {len(self.embedding_cache)} embedding cache entries")
-            
-            if self.similarity_cache_file.exists():
-                with open(self.similarity_cache_file, 'rb') as f:
-                    self.similarity_cache = pickle.load(f)
-                print(f"🔗 Loaded {len(self.similarity_cache)} similarity cache entries")
-            
-            if self.user_data_cache_file.exists():
-                with open(self.user_data_cache_file, 'rb') as f:
-                    self.user_data_cache = pickle.load(f)
-                print(f"👤 Loaded {len(self.user_data_cache)} user data cache entries")
-                
-        except Exception as e:
-            print(f"⚠️ Error loading caches: {e}")
+        """Open the on-disk caches (entries are read lazily, nothing is deserialized up front)"""
+        self._db_lock = threading.Lock()
+        # Autocommit: each write is visible to other processes (CLI runs, the UI) immediately and
+        # never holds the write lock between flushes; in WAL mode with synchronous=NORMAL commits don't fsync
+        self._db = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        
+        self.tmdb_cache = SQLiteCacheTable(self._db, self._db_lock, 'tmdb_cache')
+        self.similarity_cache = SQLiteCacheTable(self._db, self._db_lock, 'similarity_cache')
+        self.user_data_cache = SQLiteCacheTable(self._db, self._db_lock, 'user_data_cache')
+        self.embedding_cache = EmbeddingStore(self.embedding_index_file)
+        
+        print(f"📁 Opened cache store with {len(self.tmdb_cache)} TMDB and {len(self.embedding_cache)} embedding entries")
     
     def _save_caches(self):
-        """Save caches to disk"""
+        """Flush pending cache writes to disk (SQLite tables are autocommit, so only embeddings are pending)"""
         try:
-            with open(self.tmdb_cache_file, 'wb') as f:
-                pickle.dump(self.tmdb_cache, f)
-            
-            with open(self.embedding_cache_file, 'wb') as f:
-                pickle.dump(self.embedding_cache, f)
-            
-            with open(self.similarity_cache_file, 'wb') as f:
-                pickle.dump(self.similarity_cache, f)
-            
-            with open(self.user_data_cache_file, 'wb') as f:
-                pickle.dump(self.user_data_cache, f)
-                
+            self.embedding_cache.save()
         except Exception as e:
             print(f"⚠️ Error saving caches: {e}")
     
-    def _is_cache_valid(self, timestamp: datetime) -> bool:
-        """Check if cache entry is still valid"""
-        return datetime.now() - timestamp < self.ttl
+    def _is_cache_valid(self, timestamp: float) -> bool:
+        """Check if cache entry is still valid (timestamps are epoch seconds)"""
+        return time.time() - timestamp < self.ttl_seconds
     
-    def _generate_key(self, *args) -> str:
-        """Generate cache key from arguments"""
-        key_string = str(args)
-        return hashlib.md5(key_string.encode()).hexdigest()
+    def _generate_key(self, *args) -> int:
+        """Generate a 64-bit integer cache key from arguments"""
+        return int.from_bytes(hashlib.blake2b(repr(args).encode(), digest_size=8).digest(), 'little')
     
-    def get_tmdb_movie(self, movie_id: int, api_key: str) -> Optional[Dict]:
-        """Get movie from TMDB with caching"""
-        cache_key = f"movie_{movie_id}"
+    def _generate_stream_key(self, texts: List[str]) -> int:
+        """Generate a 64-bit integer cache key for a list of texts, hashing them incrementally"""
+        hasher = hashlib.blake2b(digest_size=8)
+        for text in texts:
+            encoded = text.encode()
+            # Length prefix keeps ['ab', 'c'] and ['a', 'bc'] distinct
+            hasher.update(len(encoded).to_bytes(4, 'little'))
+            hasher.update(encoded)
+        return int.from_bytes(hasher.digest(), 'little')
+    
+    def _tmdb_page_key(self, endpoint: str, page: int, params: Optional[Dict]) -> str:
+        """Cache key for a TMDB list page; params are canonicalized so key order never matters"""
+        blob = json.dumps(params or {}, sort_keys=True, separators=(',', ':')).encode()
+        return f"page_{endpoint}_{page}_{hashlib.blake2b(blob, digest_size=8).hexdigest()}"
+    
+    def _tmdb_ttl(self, endpoint: str) -> float:
+        """TTL in seconds for a TMDB endpoint - stable movie details live longer than trending lists"""
+        if endpoint.startswith('movie/') and endpoint.split('/')[-1].isdigit():
+            return TMDB_MOVIE_TTL
+        if endpoint.startswith('trending/'):
+            return TMDB_TRENDING_TTL
+        return self.ttl_seconds
+    
+    def _tmdb_request(self, url: str, params: Dict, headers: Dict):
+        """Rate-limited GET against TMDB, honouring Retry-After on 429 and backing off on transient 5xx"""
+        for attempt in range(TMDB_MAX_RETRIES + 1):
+            self._bucket.acquire()
+            response = self.session.get(url, params=params, headers=headers, timeout=5)
+            
+            if response.status_code not in TMDB_RETRY_STATUSES or attempt == TMDB_MAX_RETRIES:
+                return response
+            
+            if response.status_code == 429:
+                retry_after = response.headers.get('Retry-After', '1')
+                time.sleep(int(retry_after) if retry_after.isdigit() else 1)
+            else:
+                time.sleep(TMDB_BACKOFF_SECONDS * 2 ** attempt)
         
-        if cache_key in self.tmdb_cache:
-            entry = self.tmdb_cache[cache_key]
-            if self._is_cache_valid(entry['timestamp']):
-                return entry['data']
+        return response
+    
+    def _get_tmdb_cached(self, cache_key: str, endpoint: str, params: Dict) -> Optional[Dict]:
+        """Serve a TMDB response from cache, revalidating expired entries with their ETag"""
+        entry = self.tmdb_cache.get(cache_key)
+        ttl = self._tmdb_ttl(endpoint)
+        
+        if entry and time.time() - entry['timestamp'] < ttl:
+            return entry['data']
+        
+        # Expired or missing - conditional request lets TMDB answer 304 for unchanged payloads
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        
+        url = f"https://api.themoviedb.org/3/{endpoint}"
+        response = self._tmdb_request(url, params, headers)
+        
+        if response.status_code == 304 and entry:
+            entry['timestamp'] = time.time()
+            self.tmdb_cache[cache_key] = entry
+            return entry['data']
+        
+        if response.status_code == 200:
+            data = orjson.loads(response.content) if ORJSON_AVAILABLE else response.json()
+            
+            # Cache the result (api_key is never part of the key)
+            self.tmdb_cache[cache_key] = {
+                'data': data,
+                'timestamp': time.time(),
+                'etag': response.headers.get('ETag')
+            }
+            return data
         
-        # Cache miss - fetch from API
+        return None
+    
+    def get_tmdb_movie(self, movie_id: int, api_key: str) -> Optional[Dict]:
+        """Get movie from TMDB with caching"""
         try:
-            url = f"https://api.themoviedb.org/3/movie/{movie_id}"
-            params = {'api_key': api_key}
-            response = requests.get(url, params=params, timeout=5)
-            
-            if response.status_code == 200:
-                movie_data = response.json()
-                
-                # Cache the result
-                self.tmdb_cache[cache_key] = {
-                    'data': movie_data,
-                    'timestamp': datetime.now()
-                }
-                
-                return movie_data
+            return self._get_tmdb_cached(f"movie_{movie_id}", f"movie/{movie_id}", {'api_key': api_key})
         except Exception as e:
             print(f"⚠️ TMDB API error for movie {movie_id}: {e}")
         
         return None
     
+    def get_tmdb_movies_batch(self, movie_ids: List[int], api_key: str) -> List[Optional[Dict]]:
+        """Get several movies from TMDB, fetching cache misses concurrently over the shared session"""
+        with ThreadPoolExecutor(max_workers=TMDB_MAX_WORKERS) as executor:
+            return list(executor.map(lambda movie_id: self.get_tmdb_movie(movie_id, api_key), movie_ids))
+    
     def get_tmdb_page(self, endpoint: str, page: int, api_key: str, params: Dict = None) -> Optional[Dict]:
         """Get TMDB page with caching"""
-        cache_key = f"page_{endpoint}_{page}_{hash(str(params))}"
+        cache_key = self._tmdb_page_key(endpoint, page, params)
         
-        if cache_key in self.tmdb_cache:
-            entry = self.tmdb_cache[cache_key]
-            if self._is_cache_valid(entry['timestamp']):
-                return entry['data']
+        request_params = {'api_key': api_key, 'page': page}
+        if params:
+            request_params.update(params)
         
-        # Cache miss - fetch from API
         try:
-            url = f"https://api.themoviedb.org/3/{endpoint}"
-            request_params = {'api_key': api_key, 'page': page}
-            if params:
-                request_params.update(params)
-            
-            response = requests.get(url, params=request_params, timeout=5)
+            return self._get_tmdb_cached(cache_key, endpoint, request_params)
+        except Exception as e:
+            print(f"⚠️ TMDB API error for {endpoint} page {page}: {e}")
+        
+        return None
+    
+    def get_embeddings_batch(self, texts: List[str], model, batch_size: Optional[int] = None) -> List[Optional[np.ndarray]]:
+        """Get text embeddings with caching, encoding all misses in length-sorted batches"""
+        embeddings = [None] * len(texts)
+        missing = {}
+        missing_keys = {}
+        now = time.time()
+        
+        for i, text in enumerate(texts):
+            cache_key = self._generate_key(text)
+            entry = self.embedding_cache.get(cache_key)
+            if entry and self._is_cache_valid(entry['timestamp']):
+                embeddings[i] = entry['data']
+            else:
+                missing.setdefault(text, []).append(i)
+                missing_keys[text] = cache_key
+        
+        if not missing or model is None:
+            return embeddings
+        
+        # Cache miss - sort by length so each mini-batch pads to similar-length texts
+        try:
+            missing_texts = sorted(missing, key=len)
+            encoded = model.encode(
+                missing_texts,
+                batch_size=batch_size or self.embedding_batch_size,
+                convert_to_numpy=True,
+                # Unit vectors keep every component well inside float16 range and precision
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
             
-            if response.status_code == 200:
-                page_data = response.json()
-                
+            for text, embedding in zip(missing_texts, encoded.astype(EMBEDDING_DTYPE)):
                 # Cache the result
-                self.tmdb_cache[cache_key] = {
-                    'data': page_data,
-                    'timestamp': datetime.now()
+                self.embedding_cache[missing_keys[text]] = {
+                    'data': embedding,
+                    'timestamp': now
                 }
-                
-                return page_data
+                for i in missing[text]:
+                    embeddings[i] = embedding
         except Exception as e:
-            print(f"⚠️ TMDB API error for {endpoint} page {page}: {e}")
+            print(f"⚠️ Embedding error: {e}")
         
-        return None
+        return embeddings
     
     def get_embedding(self, text: str, model) -> Optional[np.ndarray]:
         """Get text embedding with caching"""
-        cache_key = self._generate_key(text)
+        return self.get_embeddings_batch([text], model)[0]
+    
+    def get_user_embeddings(self, user_id: int, movie_texts: List[str], model) -> Optional[np.ndarray]:
+        """Get user content preferences with caching"""
+        cache_key = f"user_emb_{user_id}_{self._generate_stream_key(movie_texts)}"
         
         if cache_key in self.embedding_cache:
             entry = self.embedding_cache[cache_key]
             if self._is_cache_valid(entry['timestamp']):
                 return entry['data']
         
-        # Cache miss - compute embedding
-        try:
-            if model is None:
-                return None
-            
-            embedding = model.encode([text], convert_to_tensor=True)[0]
-            if torch.is_tensor(embedding):
-                embedding = embedding.cpu().numpy()
-            
-            # Cache the result
-            self.embedding_cache[cache_key] = {
-                'data': embedding,
-                'timestamp': datetime.now()
-            }
-            
-            return embedding
-        except Exception as e:
-            print(f"⚠️ Embedding error: {e}")
+        # Cache miss - compute user embeddings (per-movie embeddings are shared with candidate scoring)
+        if model is None or not movie_texts:
+            return None
         
-        return None
+        embeddings = [e for e in self.get_embeddings_batch(movie_texts, model) if e is not None]
+        if not embeddings:
+            return None
+        
+        user_embedding = np.mean(embeddings, axis=0, dtype=np.float32).astype(EMBEDDING_DTYPE)
+        
+        # Cache the result
+        self.embedding_cache[cache_key] = {
+            'data': user_embedding,
+            'timestamp': time.time()
+        }
+        self._get_user_emb_index()[user_id].add(cache_key)
+        
+        return user_embedding
     
-    def get_user_embeddings(self, user_id: int, movie_texts: List[str], model) -> Optional[np.ndarray]:
-        """Get user content preferences with caching"""
-        cache_key = f"user_emb_{user_id}_{self._generate_key(*movie_texts)}"
+    def get_user_history_embedding(self, user_id: int, history: List[int], compute_func) -> Optional[np.ndarray]:
+        """Get a user's content embedding keyed by the watched ids it was built from
+        
+        Lets returning users skip the TMDB detail lookups entirely; a changed history is a new key.
+        """
+        history_key = self._generate_stream_key([str(movie_id) for movie_id in sorted(history)])
+        cache_key = f"user_emb_{user_id}_hist_{history_key}"
         
         if cache_key in self.embedding_cache:
             entry = self.embedding_cache[cache_key]
             if self._is_cache_valid(entry['timestamp']):
                 return entry['data']
         
-        # Cache miss - compute user embeddings
-        try:
-            if model is None or not movie_texts:
-                return None
-            
-            embeddings = model.encode(movie_texts, convert_to_tensor=True)
-            if torch.is_tensor(embeddings):
-                embeddings = embeddings.cpu().numpy()
-            
-            user_embedding = np.mean(embeddings, axis=0)
-            
-            # Cache the result
-            self.embedding_cache[cache_key] = {
-                'data': user_embedding,
-                'timestamp': datetime.now()
-            }
-            
-            return user_embedding
-        except Exception as e:
-            print(f"⚠️ User embedding error: {e}")
+        user_embedding = compute_func()
+        if user_embedding is None:
+            return None
         
-        return None
+        self.embedding_cache[cache_key] = {
+            'data': user_embedding,
+            'timestamp': time.time()
+        }
+        self._get_user_emb_index()[user_id].add(cache_key)
+        
+        return user_embedding
     
     def get_similarity(self, key1: str, key2: str, compute_func) -> float:
         """Get similarity with caching"""
@@ -267,7 +809,7 @@ class CacheManager:
             # Cache the result
             self.similarity_cache[cache_key] = {
                 'data': similarity,
-                'timestamp': datetime.now()
+                'timestamp': time.time()
             }
             
             return similarity
@@ -275,14 +817,14 @@ class CacheManager:
             print(f"⚠️ Similarity computation error: {e}")
             return 0.0
     
-    def get_user_data(self, username: str, fetch_func) -> Optional[Dict]:
-        """Get user data with caching"""
+    def get_user_data(self, username: str, fetch_func, fresh: bool = False) -> Optional[Dict]:
+        """Get user data with caching (``fresh`` skips the cached copy but still stores the new one)"""
         cache_key = f"user_{username}"
         
-        if cache_key in self.user_data_cache:
+        if not fresh and cache_key in self.user_data_cache:
             entry = self.user_data_cache[cache_key]
             # Shorter TTL for user data (1 hour)
-            if datetime.now() - entry['timestamp'] < timedelta(hours=1):
+            if time.time() - entry['timestamp'] < USER_DATA_TTL:
                 return entry['data']
         
         # Cache miss - fetch user data
@@ -293,7 +835,7 @@ class CacheManager:
                 # Cache the result
                 self.user_data_cache[cache_key] = {
                     'data': user_data,
-                    'timestamp': datetime.now()
+                    'timestamp': time.time()
                 }
             
             return user_data
@@ -302,6 +844,16 @@ class CacheManager:
         
         return None
     
+    def _get_user_emb_index(self) -> Dict[int, set]:
+        """user_id -> cached user-embedding keys; built from the store once, then kept up to date"""
+        if self._user_emb_index is None:
+            index = defaultdict(set)
+            for key in self.embedding_cache:
+                if key.startswith('user_emb_'):
+                    index[int(key.split('_')[2])].add(key)
+            self._user_emb_index = index
+        return self._user_emb_index
+    
     def invalidate_user_cache(self, username: str):
         """Invalidate user-specific caches when user watches new movie"""
         cache_key = f"user_{username}"
@@ -309,37 +861,42 @@ class CacheManager:
             del self.user_data_cache[cache_key]
         
         # Also invalidate user embeddings
-        keys_to_remove = [k for k in self.embedding_cache.keys() if f"user_emb_{username}" in k]
-        for key in keys_to_remove:
-            del self.embedding_cache[key]
+        for key in self._get_user_emb_index().pop(USER_ID_MAP.get(username, 1), ()):
+            self.embedding_cache.pop(key, None)
     
     def cleanup_expired(self):
         """Remove expired cache entries"""
-        now = datetime.now()
+        now = time.time()
         
-        # Clean TMDB cache
+        # Clean TMDB cache (entries with an ETag are kept longer so they can be revalidated)
         expired_keys = [k for k, v in self.tmdb_cache.items() 
-                       if now - v['timestamp'] > self.ttl]
+                       if now - v['timestamp'] > (TMDB_ETAG_RETENTION if v.get('etag') else TMDB_MOVIE_TTL)]
         for key in expired_keys:
             del self.tmdb_cache[key]
         
         # Clean embedding cache
         expired_keys = [k for k, v in self.embedding_cache.items() 
-                       if now - v['timestamp'] > self.ttl]
+                       if now - v['timestamp'] > self.ttl_seconds]
         for key in expired_keys:
             del self.embedding_cache[key]
         
         # Clean similarity cache
         expired_keys = [k for k, v in self.similarity_cache.items() 
-                       if now - v['timestamp'] > self.ttl]
+                       if now - v['timestamp'] > self.ttl_seconds]
         for key in expired_keys:
             del self.similarity_cache[key]
         
         # Clean user data cache (shorter TTL)
         expired_keys = [k for k, v in self.user_data_cache.items() 
-                       if now - v['timestamp'] > timedelta(hours=1)]
+                       if now - v['timestamp'] > USER_DATA_TTL]
         for key in expired_keys:
             del self.user_data_cache[key]
+        
+        # Bound every store so long-running use doesn't grow the cache without limit
+        self.tmdb_cache.trim(CACHE_MAX_ENTRIES['tmdb'])
+        self.embedding_cache.trim(CACHE_MAX_ENTRIES['embedding'])
+        self.similarity_cache.trim(CACHE_MAX_ENTRIES['similarity'])
+        self.user_data_cache.trim(CACHE_MAX_ENTRIES['user_data'])
     
     def get_cache_stats(self) -> Dict:
         """Get cache statistics"""
@@ -358,12 +915,15 @@ class CacheManager:
         self._save_caches()
         print("💾 Caches saved and cleaned up")
     
-    def __del__(self):
-        """Save caches when object is destroyed"""
-        try:
+    def _schedule_flush(self):
+        """Flush the caches every CACHE_FLUSH_INTERVAL seconds on a daemon timer"""
+        def flush():
             self._save_caches()
-        except:
-            pass
+            self._schedule_flush()
+        
+        timer = threading.Timer(CACHE_FLUSH_INTERVAL, flush)
+        timer.daemon = True
+        timer.start()
 
 class CollaborativeFilteringEngine:
     """Implements User-User and Item-Item Collaborative Filtering with current database schema"""
@@ -374,10 +934,36 @@ class CollaborativeFilteringEngine:
         self.user_similarity_cache = {}
         self.item_similarity_cache = {}
         
-    def build_rating_matrix_from_db(self, conn) -> Tuple[pd.DataFrame, Dict, Dict]:
-        """Build user-item rating matrix from current database schema"""
+        # (watched_movies fingerprint, matrix, user_to_idx, item_to_idx) of the last build
+        self._matrix_cache = None
+        self._matrix_lock = threading.Lock()
+    
+    def get_rating_matrix(self, conn) -> Tuple[Optional['csr_matrix'], Dict, Dict]:
+        """Rating matrix from build_rating_matrix_from_db, rebuilt only when watched_movies has changed"""
+        # Row count catches inserts/deletes; updated_at (maintained by trigger) catches rating changes
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*), MAX(updated_at) FROM watched_movies WHERE rating IS NOT NULL")
+        fingerprint = tuple(cursor.fetchone())
+        
+        # Concurrent profile refreshes wait here and share one build
+        with self._matrix_lock:
+            if self._matrix_cache is not None and self._matrix_cache[0] == fingerprint:
+                print("📦 Rating matrix cache hit")
+                return self._matrix_cache[1:]
+            
+            result = self.build_rating_matrix_from_db(conn)
+            if result[0] is not None:
+                self._matrix_cache = (fingerprint,) + result
+            return result
+        
+    def build_rating_matrix_from_db(self, conn) -> Tuple[Optional['csr_matrix'], Dict, Dict]:
+        """Build a sparse (CSR) user-item rating matrix from current database schema"""
         try:
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            from scipy.sparse import csr_matrix
+            
+            # Server-side tuple cursor: rows are streamed in batches instead of materialized as dicts
+            cursor = conn.cursor(name='cf_rating_matrix')
+            cursor.itersize = RATING_FETCH_BATCH
             
             # Fetch all ratings from watched_movies table
             cursor.execute("""
@@ -386,183 +972,184 @@ class CollaborativeFilteringEngine:
                 WHERE rating IS NOT NULL
             """)
             
-            ratings_data = cursor.fetchall()
-            
-            if not ratings_data:
-                return pd.DataFrame(), {}, {}
-            
             # Convert rating enum to numeric (same as existing mapping)
             rating_map = {'disliked': 3.0, 'good': 7.0, 'loved': 9.0}
             
-            # Build ratings list
-            processed_ratings = []
-            for row in ratings_data:
-                numeric_rating = rating_map.get(row['rating'], 5.0)
-                processed_ratings.append({
-                    'user_id': row['user_id'],
-                    'movie_id': row['tmdb_id'],
-                    'rating': numeric_rating
-                })
+            # watched_movies is UNIQUE(user_id, tmdb_id), so each (user, movie) pair appears once
+            processed_ratings = {}
+            for user_id, tmdb_id, rating in cursor:
+                processed_ratings[(user_id, tmdb_id)] = rating_map.get(rating, 5.0)
+            cursor.close()
             
             if not processed_ratings:
-                return pd.DataFrame(), {}, {}
+                return None, {}, {}
             
-            # Create rating matrix
-            rating_df = pd.DataFrame(processed_ratings)
-            rating_matrix = rating_df.pivot(index='user_id', columns='movie_id', values='rating')
-            rating_matrix = rating_matrix.fillna(0)  # Fill NaN with 0
+            # Create mappings (sorted, matching the old pivot's row/column order)
+            user_to_idx = {user_id: idx for idx, user_id in enumerate(sorted({u for u, _ in processed_ratings}))}
+            item_to_idx = {movie_id: idx for idx, movie_id in enumerate(sorted({m for _, m in processed_ratings}))}
             
-            # Create mappings
-            user_to_idx = {user_id: idx for idx, user_id in enumerate(rating_matrix.index)}
-            item_to_idx = {movie_id: idx for idx, movie_id in enumerate(rating_matrix.columns)}
+            # Create rating matrix as CSR arrays; unrated cells are implicit zeros
+            count = len(processed_ratings)
+            rows = np.fromiter((user_to_idx[u] for u, _ in processed_ratings), dtype=np.int32, count=count)
+            cols = np.fromiter((item_to_idx[m] for _, m in processed_ratings), dtype=np.int32, count=count)
+            data = np.fromiter(processed_ratings.values(), dtype=np.float64, count=count)
+            rating_matrix = csr_matrix((data, (rows, cols)), shape=(len(user_to_idx), len(item_to_idx)))
             
             return rating_matrix, user_to_idx, item_to_idx
             
         except Exception as e:
             print(f"Error building rating matrix: {e}")
-            return pd.DataFrame(), {}, {}
+            return None, {}, {}
+    
+    @staticmethod
+    def calculate_user_means(rating_rows: 'csr_matrix') -> np.ndarray:
+        """Mean of each row's rated (non-zero) entries; 0 for rows with no ratings"""
+        rating_counts = np.diff(rating_rows.indptr)
+        return np.asarray(rating_rows.sum(axis=1)).ravel() / np.maximum(rating_counts, 1)
     
-    def calculate_user_similarity(self, rating_matrix: pd.DataFrame, user_id: int, target_user_id: int) -> float:
+    def calculate_user_similarities(self, rating_matrix: 'csr_matrix', target_idx: int) -> np.ndarray:
+        """Pearson correlation of one user against every user, over each pair's co-rated items"""
+        mask = rating_matrix.copy()
+        mask.data = np.ones_like(mask.data)
+        target_ratings = rating_matrix[target_idx].toarray().ravel()
+        target_mask = (target_ratings > 0).astype(np.float64)
+        
+        # Per-pair sums restricted to co-rated items (unrated cells are 0, so products mask themselves)
+        n = mask @ target_mask
+        sum_x = rating_matrix @ target_mask
+        sum_y = mask @ target_ratings
+        sum_xx = rating_matrix.multiply(rating_matrix) @ target_mask
+        sum_yy = mask @ (target_ratings * target_ratings)
+        sum_xy = rating_matrix @ target_ratings
+        
+        numerator = n * sum_xy - sum_x * sum_y
+        denominator = np.sqrt(np.clip(n * sum_xx - sum_x ** 2, 0, None) * np.clip(n * sum_yy - sum_y ** 2, 0, None))
+        
+        # Constant ratings have undefined correlation; treat as 0 like the per-pair version
+        similarities = np.zeros(rating_matrix.shape[0])
+        valid = (n >= self.min_common_items) & (denominator > 1e-12)
+        similarities[valid] = numerator[valid] / denominator[valid]
+        return np.clip(similarities, -1.0, 1.0)
+    
+    def calculate_user_similarity(self, rating_matrix: 'csr_matrix', user_idx: int, target_user_idx: int) -> float:
         """Calculate similarity between two users using Pearson correlation"""
-        if user_id == target_user_id:
+        if user_idx == target_user_idx:
             return 1.0
-        
-        if user_id not in rating_matrix.index or target_user_id not in rating_matrix.index:
-            return 0.0
-        
-        user1_ratings = rating_matrix.loc[user_id]
-        user2_ratings = rating_matrix.loc[target_user_id]
-        
-        # Find commonly rated items
-        common_items = (user1_ratings > 0) & (user2_ratings > 0)
-        
-        if common_items.sum() < self.min_common_items:
-            return 0.0
-        
-        user1_common = user1_ratings[common_items]
-        user2_common = user2_ratings[common_items]
-        
-        try:
-            correlation, _ = pearsonr(user1_common, user2_common)
-            return correlation if not np.isnan(correlation) else 0.0
-        except:
-            return 0.0
+        return float(self.calculate_user_similarities(rating_matrix, target_user_idx)[user_idx])
+    
+    def calculate_item_similarities(self, item_columns: 'csc_matrix', item_idxs: List[int],
+                                    target_item_idxs: List[int]) -> np.ndarray:
+        """Cosine similarity of each item against each target item, over the users who rated both"""
+        items = item_columns[:, item_idxs]
+        targets = item_columns[:, target_item_idxs]
+        items_mask = items.copy()
+        items_mask.data = np.ones_like(items_mask.data)
+        targets_mask = targets.copy()
+        targets_mask.data = np.ones_like(targets_mask.data)
+        
+        # Unrated cells are 0, so every product below is already restricted to common users
+        dot = (items.T @ targets).toarray()
+        items_sq = (items.multiply(items).T @ targets_mask).toarray()
+        targets_sq = (items_mask.T @ targets.multiply(targets)).toarray()
+        common_users = (items_mask.T @ targets_mask).toarray()
+        
+        # Ratings are strictly positive, so the norms over common users are never zero
+        similarities = np.zeros(dot.shape)
+        valid = common_users >= self.min_common_users
+        similarities[valid] = dot[valid] / np.sqrt(items_sq[valid] * targets_sq[valid])
+        return similarities
     
-    def calculate_item_similarity(self, rating_matrix: pd.DataFrame, item_id: int, target_item_id: int) -> float:
+    def calculate_item_similarity(self, item_columns: 'csc_matrix', item_idx: int, target_item_idx: int) -> float:
         """Calculate similarity between two items using cosine similarity"""
-        if item_id == target_item_id:
+        if item_idx == target_item_idx:
             return 1.0
-        
-        if item_id not in rating_matrix.columns or target_item_id not in rating_matrix.columns:
-            return 0.0
-        
-        item1_ratings = rating_matrix[item_id]
-        item2_ratings = rating_matrix[target_item_id]
-        
-        # Find users who rated both items
-        common_users = (item1_ratings > 0) & (item2_ratings > 0)
-        
-        if common_users.sum() < self.min_common_users:
-            return 0.0
-        
-        item1_common = item1_ratings[common_users].values.reshape(1, -1)
-        item2_common = item2_ratings[common_users].values.reshape(1, -1)
-        
-        try:
-            similarity = cosine_similarity(item1_common, item2_common)[0][0]
-            return similarity if not np.isnan(similarity) else 0.0
-        except:
-            return 0.0
+        return float(self.calculate_item_similarities(item_columns, [item_idx], [target_item_idx])[0, 0])
     
-    def get_user_based_recommendations(self, rating_matrix: pd.DataFrame, user_id: int,
-                                     candidate_movies: List[int], k_neighbors: int = 15) -> Dict[int, float]:
+    def get_user_based_recommendations(self, rating_matrix: 'csr_matrix', user_to_idx: Dict, item_to_idx: Dict,
+                                     user_id: int, candidate_movies: List[int], k_neighbors: int = 15) -> Dict[int, float]:
         """Generate recommendations using User-User Collaborative Filtering"""
-        if user_id not in rating_matrix.index:
+        if user_id not in user_to_idx:
             return {}
         
-        # Find similar users
-        user_similarities = []
-        target_user_ratings = rating_matrix.loc[user_id]
+        # Find similar users: Pearson against every user at once
+        target_idx = user_to_idx[user_id]
+        similarities = self.calculate_user_similarities(rating_matrix, target_idx)
+        similarities[target_idx] = 0.0
         
-        for other_user_id in rating_matrix.index:
-            if other_user_id != user_id:
-                similarity = self.calculate_user_similarity(rating_matrix, user_id, other_user_id)
-                if similarity > 0:
-                    user_similarities.append((other_user_id, similarity))
+        # Take the top k positive similarities (partition first, then order just those k)
+        positive = np.flatnonzero(similarities > 0)
+        if len(positive) > k_neighbors:
+            positive = positive[np.argpartition(-similarities[positive], k_neighbors - 1)[:k_neighbors]]
+        top = positive[np.argsort(-similarities[positive], kind='stable')]
+        
+        if len(top) == 0:
+            return {}
         
-        # Sort by similarity and take top k
-        user_similarities.sort(key=lambda x: x[1], reverse=True)
-        top_similar_users = user_similarities[:k_neighbors]
+        # Mean of rated items for the target and its neighbours only, for mean-centered predictions
+        neighbour_rows = rating_matrix[top]
+        neighbour_means = self.calculate_user_means(neighbour_rows)
+        user_mean = self.calculate_user_means(rating_matrix[target_idx])[0]
         
-        if not top_similar_users:
+        # Candidate movies the target user hasn't rated yet
+        target_ratings = rating_matrix[target_idx].toarray().ravel()
+        candidates = [movie_id for movie_id in dict.fromkeys(candidate_movies)
+                      if movie_id in item_to_idx and target_ratings[item_to_idx[movie_id]] == 0]
+        if not candidates:
             return {}
         
-        # Calculate predicted ratings for candidate movies
-        predictions = {}
-        for movie_id in candidate_movies:
-            if movie_id in rating_matrix.columns and target_user_ratings[movie_id] == 0:
-                numerator = 0
-                denominator = 0
-                
-                for similar_user_id, similarity in top_similar_users:
-                    similar_user_rating = rating_matrix.loc[similar_user_id, movie_id]
-                    if similar_user_rating > 0:
-                        # Use mean-centered ratings
-                        similar_user_mean = rating_matrix.loc[similar_user_id][rating_matrix.loc[similar_user_id] > 0].mean()
-                        numerator += similarity * (similar_user_rating - similar_user_mean)
-                        denominator += abs(similarity)
-                
-                if denominator > 0:
-                    user_mean = target_user_ratings[target_user_ratings > 0].mean()
-                    predicted_rating = user_mean + (numerator / denominator)
-                    predictions[movie_id] = max(0, min(10, predicted_rating))
+        # Calculate predicted ratings for candidate movies from the neighbours' ratings
+        neighbour_ratings = neighbour_rows[:, [item_to_idx[movie_id] for movie_id in candidates]].toarray()
+        rated = neighbour_ratings > 0
+        top_similarities = similarities[top]
+        
+        numerator = top_similarities @ np.where(rated, neighbour_ratings - neighbour_means[:, None], 0.0)
+        denominator = np.abs(top_similarities) @ rated
         
-        return predictions
+        # Clip predictions to the rating scale for every candidate with at least one rated neighbour
+        has_support = denominator > 0
+        scores = np.clip(user_mean + numerator[has_support] / denominator[has_support], 0, 10)
+        
+        return dict(zip(np.asarray(candidates)[has_support].tolist(), scores.tolist()))
     
-    def get_item_based_recommendations(self, rating_matrix: pd.DataFrame, user_id: int,
-                                     candidate_movies: List[int], k_neighbors: int = 15) -> Dict[int, float]:
+    def get_item_based_recommendations(self, rating_matrix: 'csr_matrix', user_to_idx: Dict, item_to_idx: Dict,
+                                     user_id: int, candidate_movies: List[int], k_neighbors: int = 15) -> Dict[int, float]:
         """Generate recommendations using Item-Item Collaborative Filtering"""
-        if user_id not in rating_matrix.index:
+        if user_id not in user_to_idx:
             return {}
         
-        user_ratings = rating_matrix.loc[user_id]
-        rated_movies = user_ratings[user_ratings > 0].index.tolist()
+        user_ratings = rating_matrix[user_to_idx[user_id]].toarray().ravel()
+        rated_items = np.flatnonzero(user_ratings > 0)
         
-        if not rated_movies:
+        if len(rated_items) == 0:
             return {}
         
-        predictions = {}
-        for movie_id in candidate_movies:
-            if movie_id not in rating_matrix.columns or user_ratings[movie_id] > 0:
-                continue
-            
-            # Find similar items to this movie
-            item_similarities = []
-            for rated_movie_id in rated_movies:
-                similarity = self.calculate_item_similarity(rating_matrix, movie_id, rated_movie_id)
-                if similarity > 0:
-                    item_similarities.append((rated_movie_id, similarity))
-            
-            # Sort by similarity and take top k
-            item_similarities.sort(key=lambda x: x[1], reverse=True)
-            top_similar_items = item_similarities[:k_neighbors]
-            
-            if not top_similar_items:
-                continue
-            
-            # Calculate predicted rating
-            numerator = 0
-            denominator = 0
-            for similar_item_id, similarity in top_similar_items:
-                user_rating_for_similar_item = user_ratings[similar_item_id]
-                numerator += similarity * user_rating_for_similar_item
-                denominator += abs(similarity)
-            
-            if denominator > 0:
-                predicted_rating = numerator / denominator
-                predictions[movie_id] = max(0, min(10, predicted_rating))
+        candidates = [movie_id for movie_id in dict.fromkeys(candidate_movies)
+                      if movie_id in item_to_idx and user_ratings[item_to_idx[movie_id]] == 0]
+        if not candidates:
+            return {}
+        
+        # Candidate x rated-item similarities in one batch of sparse products
+        similarities = self.calculate_item_similarities(
+            rating_matrix.tocsc(), [item_to_idx[movie_id] for movie_id in candidates], rated_items
+        )
+        
+        # Top k positive similarities per candidate (order within the k doesn't affect the weighted sum)
+        if similarities.shape[1] > k_neighbors:
+            top = np.argpartition(-similarities, k_neighbors - 1, axis=1)[:, :k_neighbors]
+        else:
+            top = np.broadcast_to(np.arange(similarities.shape[1]), similarities.shape)
+        top_similarities = np.take_along_axis(similarities, top, axis=1)
+        top_similarities = np.where(top_similarities > 0, top_similarities, 0.0)
+        top_ratings = user_ratings[rated_items][top]
         
-        return predictions
+        # Calculate predicted ratings
+        numerator = (top_similarities * top_ratings).sum(axis=1)
+        denominator = np.abs(top_similarities).sum(axis=1)
+        
+        has_support = denominator > 0
+        scores = np.clip(numerator[has_support] / denominator[has_support], 0, 10)
+        
+        return dict(zip(np.asarray(candidates)[has_support].tolist(), scores.tolist()))
 
 class FireTVRecommendationService:
 
@@ -581,6 +1168,11 @@ class FireTVRecommendationService:
         }
         self.db_config.update(db_config)
         
+        # Connection pool is created on first use so cache-only commands never touch the DB
+        self.db_pool = None
+        self._db_pool_lock = threading.Lock()
+        self._state_table_ready = False
+        
         # TMDB configuration
         self.tmdb_api_key = tmdb_api_key
         self.tmdb_base_url = "https://api.themoviedb.org/3"
@@ -588,8 +1180,10 @@ class FireTVRecommendationService:
         # Initialize cache manager FIRST
         self.cache_manager = CacheManager()
         
-        # Initialize advanced features
-        self._initialize_advanced_features()
+        # Advanced ML features (torch, SentenceTransformer) load on the first recommendation run,
+        # so read-only commands like get/stats start fast
+        self._advanced_features_ready = False
+        self._advanced_features_lock = threading.Lock()
         
         # Initialize collaborative filtering with caching
         self.cf_engine = CollaborativeFilteringEngine()
@@ -598,6 +1192,8 @@ class FireTVRecommendationService:
         self.min_users_for_cf = 4  # Reduced threshold
         self.min_ratings_per_user = 3  # Reduced threshold
         self.min_total_ratings = 15  # Reduced threshold
+        self._cf_stats_cache = None  # (computed_at, (total_users, total_ratings, users_with_enough_ratings))
+        self._cf_stats_lock = threading.Lock()
         
         # Profile configurations (enhanced with quality thresholds)
         self.profile_configs = {
@@ -643,10 +1239,93 @@ class FireTVRecommendationService:
             }
         }
         
+        # (endpoint, page, genre_id) -> candidates, only while refresh_all_profiles is running
+        self._list_pages = None
+        
+        # Precompute per-profile genre lookups and SQL used on the hot paths
+        for cfg in self.profile_configs.values():
+            cfg['_genre_ids'] = [GENRE_ID_MAP[genre] for genre in cfg['preferred_genres']]
+            cfg['_n_fav'] = len(cfg['preferred_genres'])
+            cfg['_genre_mask'] = _genre_mask(cfg['preferred_genres'])
+            cfg.update(self._build_profile_sql(cfg['table_name']))
+        
+        # Opt-in idempotent index migration (FIRETV_ENSURE_INDEXES=1)
+        if os.getenv('FIRETV_ENSURE_INDEXES', '0') == '1':
+            self.ensure_indexes()
+        
         print("✅ Enhanced FireTV Recommendation Service with Caching initialized")
 
+    @staticmethod
+    def _build_profile_sql(table_name: str) -> Dict[str, str]:
+        """Build the fixed per-profile SQL statements once, since table names never change"""
+        # One array parameter per column; genres arrive as array literals since
+        # Postgres multi-dimensional arrays can't hold ragged per-row genre lists.
+        # The upserts are server-side prepared (see _execute_prepared), hence $n placeholders
+        insert_sql = f"""
+                INSERT INTO {table_name}
+                (tmdb_id, title, genres, vote_average, popularity, overview,
+                 poster_path, similarity_score, recommendation_reason)
+                SELECT tmdb_id, title, genres::text[], vote_average, popularity, overview,
+                       poster_path, similarity_score, recommendation_reason
+                FROM unnest($1::int[], $2::text[], $3::text[], $4::float8[], $5::float8[],
+                            $6::text[], $7::text[], $8::float8[], $9::text[])"""
+        row_alias = """
+                    AS r(tmdb_id, title, genres, vote_average, popularity, overview,
+                         poster_path, similarity_score, recommendation_reason"""
+        append_conflict = """
+                ON CONFLICT (tmdb_id) DO UPDATE SET
+                similarity_score = EXCLUDED.similarity_score,
+                recommendation_reason = EXCLUDED.recommendation_reason,
+                added_at = CURRENT_TIMESTAMP,
+                is_active = TRUE
+            """
+        
+        return {
+            '_delete_sql': f"DELETE FROM {table_name} WHERE is_active = TRUE",
+            '_insert_stmt': f"insert_{table_name}",
+            '_append_stmt': f"append_{table_name}",
+            '_insert_sql': insert_sql + row_alias + """)
+                ON CONFLICT (tmdb_id) DO UPDATE SET
+                title = EXCLUDED.title,
+                similarity_score = EXCLUDED.similarity_score,
+                recommendation_reason = EXCLUDED.recommendation_reason,
+                added_at = CURRENT_TIMESTAMP,
+                is_active = TRUE
+            """,
+            # Incremental adds keep the stored title
+            '_append_sql': insert_sql + row_alias + ")" + append_conflict,
+            # Same, but only the first $10 rows not already active in the profile (anti-join in SQL)
+            '_append_new_stmt': f"append_new_{table_name}",
+            '_append_new_sql': insert_sql + " WITH ORDINALITY" + row_alias + f""", ord)
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {table_name} e
+                    WHERE e.tmdb_id = r.tmdb_id AND e.is_active = TRUE
+                )
+                ORDER BY r.ord
+                LIMIT $10::int""" + append_conflict,
+            '_select_sql': f"""
+                SELECT tmdb_id, title, genres, vote_average, popularity,
+                       overview, poster_path, similarity_score, added_at
+                FROM {table_name}
+                WHERE is_active = TRUE
+                ORDER BY similarity_score DESC, added_at DESC
+                LIMIT %s
+            """
+        }
+
     def _initialize_advanced_features(self):
-        """Initialize advanced ML features"""
+        """Initialize advanced ML features (once, on first use)"""
+        if self._advanced_features_ready:
+            return
+        
+        with self._advanced_features_lock:
+            if not self._advanced_features_ready:
+                _load_ml_modules()
+                self._load_advanced_features()
+                self._advanced_features_ready = True
+
+    def _load_advanced_features(self):
+        """Load the compute device and SentenceTransformer model"""
         # Initialize CUDA device
         if TORCH_AVAILABLE:
             self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -658,7 +1337,15 @@ class FireTVRecommendationService:
         # Initialize SentenceTransformer
         if SENTENCE_TRANSFORMERS_AVAILABLE and TORCH_AVAILABLE:
             try:
-                self.content_model = SentenceTransformer("all-MiniLM-L6-v2", device=str(self.device))
+                self.content_model = None
+                if str(self.device) == 'cpu' and ONNX_AVAILABLE:
+                    self.content_model = self._load_onnx_content_model()
+                if self.content_model is None:
+                    self.content_model = SentenceTransformer("all-MiniLM-L6-v2", device=str(self.device))
+                if str(self.device) == 'cuda':
+                    # Half-precision weights run on tensor cores; cached embeddings are float16 anyway
+                    self.content_model.half()
+                    self.cache_manager.embedding_batch_size = 256
                 print(f"📱 SentenceTransformer loaded on: {self.device}")
                 self.enhanced_content_similarity = True
             except Exception as e:
@@ -670,6 +1357,49 @@ class FireTVRecommendationService:
             self.enhanced_content_similarity = False
             print("📱 Using basic content similarity (SentenceTransformer not available)")
 
+    def _load_onnx_content_model(self):
+        """Load the int8-quantized ONNX export of MiniLM for faster CPU encoding, or None"""
+        try:
+            model = SentenceTransformer(
+                "all-MiniLM-L6-v2",
+                device="cpu",
+                backend="onnx",
+                model_kwargs={"file_name": ONNX_MODEL_FILE, "provider": "CPUExecutionProvider"}
+            )
+            print("⚡ Using quantized ONNX Runtime backend for SentenceTransformer")
+            return model
+        except Exception as e:
+            # Older sentence-transformers without backend support, or the export isn't available
+            print(f"⚠️  ONNX backend unavailable, using PyTorch: {e}")
+            return None
+
+    def ensure_indexes(self):
+        """Create the indexes behind the hot per-user and per-profile queries if they're missing"""
+        statements = [
+            "CREATE INDEX IF NOT EXISTS idx_watched_user_time ON watched_movies(user_id, watched_at DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_mood_user_time ON mood_selections(user_id, selected_at DESC)"
+        ]
+        for cfg in self.profile_configs.values():
+            table_name = cfg['table_name']
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_active_score "
+                f"ON {table_name}(similarity_score DESC, added_at DESC) WHERE is_active = TRUE"
+            )
+            # Genre overlap (&&) lookups when demoting a disliked movie's neighbours
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_genres ON {table_name} USING GIN (genres)"
+            )
+        
+        try:
+            with self.get_db_connection() as conn:
+                cursor = conn.cursor()
+                for statement in statements:
+                    cursor.execute(statement)
+                conn.commit()
+            self.logger.info(f"✅ Ensured {len(statements)} indexes")
+        except Exception as e:
+            self.logger.warning(f"⚠️ Could not create indexes: {e}")
+
     def setup_logging(self):
         """Configure logging (same as before)"""
         logging.basicConfig(
@@ -679,185 +1409,216 @@ class FireTVRecommendationService:
         )
         self.logger = logging.getLogger(__name__)
 
+    @contextmanager
     def get_db_connection(self):
-        """Get database connection (same as before)"""
+        """Borrow a pooled database connection, returning it to the pool afterwards"""
+        if self.db_pool is None:
+            with self._db_pool_lock:
+                if self.db_pool is None:
+                    try:
+                        self.db_pool = ThreadedConnectionPool(
+                            DB_POOL_MIN_CONN, DB_POOL_MAX_CONN,
+                            connection_factory=PreparedConnection, **self.db_config
+                        )
+                    except Exception as e:
+                        self.logger.error(f"Database connection failed: {e}")
+                        raise
+        
+        conn = self.db_pool.getconn()
         try:
-            conn = psycopg2.connect(**self.db_config)
-            return conn
-        except Exception as e:
-            self.logger.error(f"Database connection failed: {e}")
-            raise
+            yield conn
+        finally:
+            # putconn rolls back any transaction left open by the caller
+            self.db_pool.putconn(conn)
 
-    def get_user_data_from_backend(self, username: str) -> Dict:
-        """Get user data from the backend database with caching"""
+    def _execute_prepared(self, cursor, name: str, params, sql: Optional[str] = None):
+        """Run a prepared statement (PREPARED_QUERIES[name] unless ``sql`` is given), preparing it on this connection the first time"""
+        prepared = cursor.connection.prepared_statements
+        
+        if name not in prepared:
+            cursor.execute(f"PREPARE {name} AS {PREPARED_QUERIES[name] if sql is None else sql}")
+            prepared.add(name)
+        
+        placeholders = ', '.join(['%s'] * len(params))
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+
+    def get_user_data_from_backend(self, username: str, fresh: bool = False) -> Dict:
+        """Get user data from the backend database with caching (``fresh`` bypasses the cached copy)"""
         
         def fetch_user_data():
             """Internal function to fetch user data from database"""
-            conn = self.get_db_connection()
-            if not conn:
-                return {}
-            
-            try:
-                cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-                
-                # Get user ID from username
-                user_id_map = {'anshul': 1, 'shikhar': 2, 'priyanshu': 3, 'shaurya': 4}
-                user_id = user_id_map.get(username, 1)
+            with self.get_db_connection() as conn:
+                try:
+                    # Plain tuple cursor: the aggregate is a single row with a fixed column order
+                    cursor = conn.cursor()
                 
-                # Get watched movies
-                cursor.execute("""
-                    SELECT tmdb_id, title, rating, current_mood, watched_at
-                    FROM watched_movies 
-                    WHERE user_id = %s 
-                    ORDER BY watched_at DESC
-                """, (user_id,))
-                
-                watched_movies = cursor.fetchall()
-                
-                # Convert rating enum to numeric
-                rating_map = {'disliked': 3.0, 'good': 7.0, 'loved': 9.0}
-                user_history = [movie['tmdb_id'] for movie in watched_movies]
-                ratings = {
-                    str(movie['tmdb_id']): rating_map.get(movie['rating'], 5.0) 
-                    for movie in watched_movies if movie['rating']
-                }
+                    # Get user ID from username
+                    user_id = USER_ID_MAP.get(username, 1)
                 
-                # Get latest mood
-                cursor.execute("""
-                    SELECT mood FROM mood_selections 
-                    WHERE user_id = %s 
-                    ORDER BY selected_at DESC 
-                    LIMIT 1
-                """, (user_id,))
+                    # Get watch history (newest first), numeric ratings and latest mood in one row;
+                    # the rating enum is mapped to scores in SQL
+                    self._execute_prepared(cursor, 'get_user_data', (user_id,))
+                    
+                    history, ratings, total_watched, mood = cursor.fetchone()
+                    user_history = history or []
+                    ratings = ratings or {}
+                    
+                    current_mood = mood or 'neutral'
                 
-                mood_result = cursor.fetchone()
-                current_mood = mood_result['mood'] if mood_result else 'neutral'
+                    # Get user preferences from profile
+                    profile_config = self.profile_configs.get(username, {})
+                    favorite_genres = profile_config.get('preferred_genres', [])
                 
-                # Get user preferences from profile
-                profile_config = self.profile_configs.get(username, {})
-                favorite_genres = profile_config.get('preferred_genres', [])
+                    return {
+                        'user_id': user_id,
+                        'username': username,
+                        'user_history': user_history,
+                        'ratings': ratings,
+                        'favourite_genres': favorite_genres,
+                        'mood': current_mood,
+                        'time_watched': 'day',
+                        'count': 30,
+                        'total_watched': total_watched,
+                        'profile_config': profile_config
+                    }
                 
-                return {
-                    'user_id': user_id,
-                    'username': username,
-                    'user_history': user_history,
-                    'ratings': ratings,
-                    'favourite_genres': favorite_genres,
-                    'mood': current_mood,
-                    'time_watched': 'day',
-                    'count': 30,
-                    'total_watched': len(watched_movies),
-                    'profile_config': profile_config
-                }
-                
-            except Exception as e:
-                self.logger.error(f"Error fetching user data: {e}")
-                return {}
-            finally:
-                conn.close()
+                except Exception as e:
+                    self.logger.error(f"Error fetching user data: {e}")
+                    return {}
         
         # Use cache manager to get user data
-        return self.cache_manager.get_user_data(username, fetch_user_data) or {}
+        return self.cache_manager.get_user_data(username, fetch_user_data, fresh=fresh) or {}
+
+    def _watched_ids(self, user_data: Dict) -> frozenset:
+        """Watched tmdb_ids as a set; generate_recommendations builds it once and passes it to every stage"""
+        return frozenset(user_data.get('user_history', ()))
+
+    def _candidate_arrays(self, candidates: List[Dict], watched: frozenset) -> Dict:
+        """Unwatched candidates plus their scored fields as parallel arrays
+        
+        The enhanced scorer, the simple scorer and the random fallback can all run on one
+        request; generate_recommendations builds these once and hands them to each pass.
+        """
+        movies = [movie for movie in candidates if movie['tmdb_id'] not in watched]
+        count = len(movies)
+        return {
+            'movies': movies,
+            'vote_average': np.fromiter((movie.get('vote_average') or 0 for movie in movies), dtype=np.float64, count=count),
+            'popularity': np.fromiter((movie.get('popularity') or 0 for movie in movies), dtype=np.float64, count=count),
+            'genre_mask': np.fromiter((_movie_genre_mask(movie) for movie in movies), dtype=np.int64, count=count)
+        }
 
     def _get_fallback_movies_by_genre(self, genre: str, user_history: set, limit: int = 20) -> List[Dict]:
         """Get high-quality fallback movies for a specific genre"""
-        fallback_data = {
-            'Action': [
-                {'tmdb_id': 550, 'title': 'Fight Club', 'genres': ['Action', 'Drama'], 'vote_average': 8.4, 'popularity': 95.2, 'overview': 'An insomniac office worker and a soap salesman form an underground fight club.', 'release_date': '1999-10-15', 'poster_path': '/a26cQPRhJPX6GbWfQbvZdrrp9j9.jpg', 'runtime': 139},
-                {'tmdb_id': 155, 'title': 'The Dark Knight', 'genres': ['Action', 'Crime', 'Drama'], 'vote_average': 9.0, 'popularity': 98.5, 'overview': 'When the menace known as the Joker wreaks havoc on Gotham, Batman must accept one of the greatest psychological and physical tests.', 'release_date': '2008-07-18', 'poster_path': '/qJ2tW6WMUDux911r6m7haRef0WH.jpg', 'runtime': 152},
-                {'tmdb_id': 603, 'title': 'The Matrix', 'genres': ['Action', 'Science Fiction'], 'vote_average': 8.7, 'popularity': 93.8, 'overview': 'A computer hacker learns from mysterious rebels about the true nature of his reality.', 'release_date': '1999-03-30', 'poster_path': '/f89U3ADr1oiB1s9GkdPOEpXUk5H.jpg', 'runtime': 136},
-                {'tmdb_id': 680, 'title': 'Pulp Fiction', 'genres': ['Crime', 'Drama'], 'vote_average': 8.5, 'popularity': 92.1, 'overview': 'The lives of two mob hitmen, a boxer, a gangster and his wife intertwine in four tales of violence and redemption.', 'release_date': '1994-10-14', 'poster_path': '/d5iIlFn5s0ImszYzBPb8JPIfbXD.jpg', 'runtime': 154},
-                {'tmdb_id': 27205, 'title': 'Inception', 'genres': ['Action', 'Science Fiction', 'Thriller'], 'vote_average': 8.4, 'popularity': 87.9, 'overview': 'Dom Cobb is a skilled thief, the absolute best in the dangerous art of extraction.', 'release_date': '2010-07-16', 'poster_path': '/9gk7adHYeDvHkCSEqAvQNLV5Uge.jpg', 'runtime': 148}
-            ],
-            'Comedy': [
-                {'tmdb_id': 13, 'title': 'Forrest Gump', 'genres': ['Comedy', 'Drama'], 'vote_average': 8.5, 'popularity': 89.3, 'overview': 'The presidencies of Kennedy and Johnson, Vietnam, Watergate, and other history unfold through the perspective of an Alabama man.', 'release_date': '1994-07-06', 'poster_path': '/arw2vcBveWOVZr6pxd9XTd1TdQa.jpg', 'runtime': 142},
-                {'tmdb_id': 19995, 'title': 'Avatar', 'genres': ['Action', 'Adventure', 'Fantasy'], 'vote_average': 7.6, 'popularity': 87.4, 'overview': 'In the 22nd century, a paraplegic Marine is dispatched to the moon Pandora on a unique mission.', 'release_date': '2009-12-18', 'poster_path': '/6EiRUJpuoeQPghrs3YNktfnqOVh.jpg', 'runtime': 162}
-            ],
-            'Horror': [
-                {'tmdb_id': 694, 'title': 'The Shining', 'genres': ['Horror', 'Thriller'], 'vote_average': 8.2, 'popularity': 78.9, 'overview': 'A family heads to an isolated hotel for the winter where an evil presence influences the father.', 'release_date': '1980-05-23', 'poster_path': '/b6ko0IKC8MdYBBPkkA1aBPLe2yz.jpg', 'runtime': 146},
-                {'tmdb_id': 539, 'title': 'Psycho', 'genres': ['Horror', 'Mystery', 'Thriller'], 'vote_average': 8.4, 'popularity': 75.2, 'overview': 'A Phoenix secretary embezzles money and goes on the run.', 'release_date': '1960-09-08', 'poster_path': '/yz4QVqPx3h1hD1DfqqQkCq3rmxW.jpg', 'runtime': 109}
-            ],
-            'Science Fiction': [
-                {'tmdb_id': 11, 'title': 'Star Wars', 'genres': ['Adventure', 'Action', 'Science Fiction'], 'vote_average': 8.6, 'popularity': 89.1, 'overview': 'Luke Skywalker joins forces with a Jedi Knight to rescue Princess Leia from the evil Galactic Empire.', 'release_date': '1977-05-25', 'poster_path': '/6FfCtAuVAW8XJjZ7eWeLibRLWTw.jpg', 'runtime': 121}
-            ],
-            'Drama': [
-                {'tmdb_id': 278, 'title': 'The Shawshank Redemption', 'genres': ['Drama'], 'vote_average': 9.3, 'popularity': 96.7, 'overview': 'Two imprisoned men bond over years, finding solace and eventual redemption through acts of common decency.', 'release_date': '1994-09-23', 'poster_path': '/q6y0Go1tsGEsmtFryDOJo3dEmqu.jpg', 'runtime': 142},
-                {'tmdb_id': 238, 'title': 'The Godfather', 'genres': ['Crime', 'Drama'], 'vote_average': 9.2, 'popularity': 91.7, 'overview': 'The aging patriarch of an organized crime dynasty transfers control to his reluctant son.', 'release_date': '1972-03-14', 'poster_path': '/3bhkrj58Vtu7enYsRolD1fZdja1.jpg', 'runtime': 175},
-                {'tmdb_id': 240, 'title': 'The Godfather: Part II', 'genres': ['Crime', 'Drama'], 'vote_average': 9.0, 'popularity': 88.9, 'overview': 'The early life and career of Vito Corleone in 1920s New York City is portrayed.', 'release_date': '1974-12-20', 'poster_path': '/hek3koDUyRQk7FIhPXsa6mT2Zc3.jpg', 'runtime': 202}
-            ]
-        }
-        
-        movies = fallback_data.get(genre, [])
+        movies = FALLBACK_MOVIES_BY_GENRE.get(genre, ())
         # Filter out already watched movies
         filtered = [m for m in movies if m['tmdb_id'] not in user_history]
         return filtered[:limit]
 
-    def get_candidate_movies(self, user_data: Dict) -> List[Dict]:
+    def get_candidate_movies(self, user_data: Dict, user_history: Optional[frozenset] = None) -> List[Dict]:
         """Get candidate movies - enhanced with robust fallback system and multi-page TMDB fetching"""
-        user_history = set(user_data['user_history'])
+        if user_history is None:
+            user_history = self._watched_ids(user_data)
         favorite_genres = user_data['favourite_genres']
         
         # Always start with local fallback to guarantee we have movies
-        candidates = []
+        # Candidates are deduplicated as they're added: tmdb_id -> movie, first occurrence wins
+        by_id = {}
+        total_candidates = 0
         
-        # Add curated movies by preferred genres
-        for genre in favorite_genres:
-            genre_movies = self._get_fallback_movies_by_genre(genre, user_history, limit=15)
-            candidates.extend(genre_movies)
+        # Add curated movies by preferred genres, then some general high-quality movies
+        fallback_batches = [self._get_fallback_movies_by_genre(genre, user_history, limit=15) for genre in favorite_genres]
+        fallback_batches.append(self._get_fallback_movies_by_genre('Drama', user_history, limit=10))
+        for genre_movies in fallback_batches:
+            total_candidates += len(genre_movies)
+            for movie in genre_movies:
+                by_id.setdefault(movie['tmdb_id'], movie)
         
-        # Add some general high-quality movies
-        general_movies = self._get_fallback_movies_by_genre('Drama', user_history, limit=10)
-        candidates.extend(general_movies)
-        
-        self.logger.info(f"✅ Got {len(candidates)} fallback candidates")
+        self.logger.info(f"✅ Got {total_candidates} fallback candidates")
         
         # Try to supplement with TMDB multi-page fetch (but don't fail if it's not working)
         try:
             self.logger.info(f"🚀 Starting multi-page TMDB fetch for genres: {favorite_genres}")
-            tmdb_candidates = self._try_fetch_tmdb_candidates(favorite_genres, user_history)
+            genre_ids = self.profile_configs.get(user_data['username'], {}).get('_genre_ids', [])
+            # Only ask TMDB for as many new movies as still fit under the cap
+            tmdb_candidates = self._try_fetch_tmdb_candidates(
+                genre_ids, user_history | by_id.keys(), target=MAX_CANDIDATES - len(by_id)
+            )
             if tmdb_candidates:
                 # Merge without duplicates
-                existing_ids = {movie['tmdb_id'] for movie in candidates}
-                new_candidates = []
+                before = len(by_id)
                 for movie in tmdb_candidates:
-                    if movie['tmdb_id'] not in existing_ids:
-                        new_candidates.append(movie)
-                        existing_ids.add(movie['tmdb_id'])
+                    by_id.setdefault(movie['tmdb_id'], movie)
                 
-                candidates.extend(new_candidates)
-                self.logger.info(f"✅ Added {len(new_candidates)} unique TMDB candidates (total fetched: {len(tmdb_candidates)})")
+                total_candidates += len(tmdb_candidates)
+                self.logger.info(f"✅ Added {len(by_id) - before} unique TMDB candidates (total fetched: {len(tmdb_candidates)})")
             else:
                 self.logger.warning("⚠️ No TMDB candidates returned")
         except Exception as e:
             self.logger.warning(f"⚠️ TMDB multi-page fetch failed, using fallback only: {e}")
         
-        # Remove any remaining duplicates and limit total candidates for performance
-        final_candidates = []
-        seen_ids = set()
-        for movie in candidates:
-            if movie['tmdb_id'] not in seen_ids:
-                final_candidates.append(movie)
-                seen_ids.add(movie['tmdb_id'])
-                
-                # Limit to reasonable number for processing performance
-                if len(final_candidates) >= 1000:  # Increased from 800 to 1000
-                    break
+        # Limit to reasonable number for processing performance (increased from 800 to 1000)
+        final_candidates = list(by_id.values())[:MAX_CANDIDATES]
         
-        self.logger.info(f"📊 Final candidate count: {len(final_candidates)} movies (from {len(candidates)} total before deduplication)")
+        self.logger.info(f"📊 Final candidate count: {len(final_candidates)} movies (from {total_candidates} total before deduplication)")
         return final_candidates
 
-    def _try_fetch_tmdb_candidates(self, favorite_genres: List[str], user_history: set, max_attempts: int = 3) -> List[Dict]:
-        """Try to fetch from TMDB with multiple pages and endpoints using comprehensive caching"""
-        candidates = []
-        
-        # Genre ID mapping
-        genre_id_map = {
-            'Action': 28, 'Adventure': 12, 'Animation': 16, 'Comedy': 35,
-            'Crime': 80, 'Documentary': 99, 'Drama': 18, 'Family': 10751,
-            'Fantasy': 14, 'History': 36, 'Horror': 27, 'Music': 10402,
-            'Mystery': 9648, 'Romance': 10749, 'Science Fiction': 878,
-            'Thriller': 53, 'War': 10752, 'Western': 37
-        }
+    def _list_candidates(self, endpoint: str, page: int, genre_id: Optional[int] = None) -> Optional[Tuple[Dict, ...]]:
+        """Candidates for one TMDB list page, shared by all profiles within a refresh_all_profiles run"""
+        memo = self._list_pages
+        if memo is None:
+            return self._fetch_list_candidates(endpoint, page, genre_id)
+        
+        key = (endpoint, page, genre_id)
+        candidates = memo.get(key)
+        if candidates is None:
+            candidates = self._fetch_list_candidates(endpoint, page, genre_id)
+            # Failed or empty pages are retried by the next profile rather than remembered
+            if candidates:
+                memo[key] = candidates
+        return candidates
+
+    def _fetch_list_candidates(self, endpoint: str, page: int, genre_id: Optional[int] = None) -> Optional[Tuple[Dict, ...]]:
+        """Fetch one TMDB list page and convert its items to candidate dicts"""
+        params = None
+        if genre_id:
+            params = {
+                'with_genres': genre_id,
+                'sort_by': 'popularity.desc',
+                'vote_count.gte': 50,  # Movies with at least 50 votes
+            }
+        
+        page_data = self.cache_manager.get_tmdb_page(endpoint, page, self.tmdb_api_key, params)
+        if not page_data:
+            return None
+        
+        # List items already carry everything we score on, so no per-movie detail fetch
+        return tuple({
+            'tmdb_id': movie['id'],
+            'title': movie['title'],
+            'overview': movie.get('overview', ''),
+            'vote_average': movie.get('vote_average', 0.0),
+            'popularity': movie.get('popularity', 0.0),
+            'release_date': movie.get('release_date', ''),
+            'poster_path': movie.get('poster_path', ''),
+            'genres': [GENRE_NAME_BY_ID[gid] for gid in movie.get('genre_ids', []) if gid in GENRE_NAME_BY_ID],
+            'runtime': 0,
+            '_genre_mask': _genre_mask(GENRE_NAME_BY_ID.get(gid) for gid in movie.get('genre_ids', [])),
+            '_text': f"{movie['title']}. {movie.get('overview', '')}"
+        } for movie in page_data.get('results', []))
+
+    def _try_fetch_tmdb_candidates(self, genre_ids: List[int], user_history: set, target: int = None) -> List[Dict]:
+        """Try to fetch from TMDB with multiple pages and endpoints concurrently using comprehensive caching
+        
+        Stops collecting (and cancels pages not yet started) once ``target`` unique movies are gathered.
+        """
+        if target is None:
+            target = MAX_CANDIDATES
+        if target <= 0:
+            return []
+        
+        # tmdb_id -> movie; the first page a movie appears on wins
+        by_id = {}
         
         # Multiple endpoints to fetch from for maximum variety
         endpoints_to_fetch = [
@@ -869,195 +1630,174 @@ class FireTVRecommendationService:
             ('trending/movie/day', 'Trending Today')
         ]
         
-        # Fetch multiple pages from each endpoint using cache
+        # Build every page request up front so they can be fetched concurrently
+        page_requests = []
         for endpoint, description in endpoints_to_fetch:
             for page in range(1, 3):  # Fetch 2 pages from each endpoint
-                page_data = self.cache_manager.get_tmdb_page(endpoint, page, self.tmdb_api_key)
-                
-                if page_data:
-                    movies = page_data.get('results', [])
-                    self.logger.info(f"📡 Got {len(movies)} movies from {description} page {page} (cached: {page in self.cache_manager.tmdb_cache})")
-                    
-                    for movie in movies:  # Process all movies from each page
-                        if movie['id'] not in user_history:
-                            # Get detailed info using cache
-                            movie_data = self.cache_manager.get_tmdb_movie(movie['id'], self.tmdb_api_key)
-                            
-                            if movie_data:
-                                candidates.append({
-                                    'tmdb_id': movie_data['id'],
-                                    'title': movie_data['title'],
-                                    'overview': movie_data.get('overview', ''),
-                                    'vote_average': movie_data.get('vote_average', 0.0),
-                                    'popularity': movie_data.get('popularity', 0.0),
-                                    'release_date': movie_data.get('release_date', ''),
-                                    'poster_path': movie_data.get('poster_path', ''),
-                                    'genres': [genre['name'] for genre in movie_data.get('genres', [])],
-                                    'runtime': movie_data.get('runtime', 0)
-                                })
-                else:
-                    self.logger.warning(f"Failed to fetch {description} page {page}")
+                page_requests.append((endpoint, page, None, f"{description} page {page}"))
         
-        # Also fetch movies by preferred genres with multiple pages using cache
-        for genre in favorite_genres:
-            genre_id = genre_id_map.get(genre)
-            if not genre_id:
-                continue
-                
-            # Fetch multiple pages for each preferred genre
+        # Also fetch movies by preferred genres with multiple pages
+        for genre_id in genre_ids:
+            genre = GENRE_NAME_BY_ID[genre_id]
             for page in range(2, 5):  # Fetch pages 2-4 per genre for variety
-                params = {
-                    'with_genres': genre_id,
-                    'sort_by': 'popularity.desc',
-                    'vote_count.gte': 50,  # Movies with at least 50 votes
-                }
-                
-                page_data = self.cache_manager.get_tmdb_page('discover/movie', page, self.tmdb_api_key, params)
-                
-                if page_data:
-                    movies = page_data.get('results', [])
-                    self.logger.info(f"🎭 Got {len(movies)} {genre} movies from page {page} (cached)")
-                    
-                    for movie in movies:
-                        if movie['id'] not in user_history:
-                            # Get detailed info using cache
-                            movie_data = self.cache_manager.get_tmdb_movie(movie['id'], self.tmdb_api_key)
-                            
-                            if movie_data:
-                                candidates.append({
-                                    'tmdb_id': movie_data['id'],
-                                    'title': movie_data['title'],
-                                    'overview': movie_data.get('overview', ''),
-                                    'vote_average': movie_data.get('vote_average', 0.0),
-                                    'popularity': movie_data.get('popularity', 0.0),
-                                    'release_date': movie_data.get('release_date', ''),
-                                    'poster_path': movie_data.get('poster_path', ''),
-                                    'genres': [genre['name'] for genre in movie_data.get('genres', [])],
-                                    'runtime': movie_data.get('runtime', 0)
-                                })
+                page_requests.append(('discover/movie', page, genre_id, f"{genre} page {page}"))
+        
+        with ThreadPoolExecutor(max_workers=TMDB_MAX_WORKERS) as executor:
+            page_futures = [
+                (executor.submit(self._list_candidates, endpoint, page, genre_id), label)
+                for endpoint, page, genre_id, label in page_requests
+            ]
+            
+            # Collect results in request order so candidate ordering stays deterministic
+            for position, (future, label) in enumerate(page_futures):
+                page_candidates = future.result()
+                if page_candidates is not None:
+                    # Dozens of pages per fetch: debug level, lazily formatted
+                    self.logger.debug("📡 Got %d movies from %s", len(page_candidates), label)
+                    # ~20 movies per page: a set lookup beats building arrays for np.isin
+                    for movie in page_candidates:
+                        if movie['tmdb_id'] in user_history:
+                            continue
+                        by_id.setdefault(movie['tmdb_id'], movie)
+                        if len(by_id) >= target:
+                            break
                 else:
-                    self.logger.warning(f"Failed to fetch {genre} page {page}")
+                    self.logger.warning("Failed to fetch %s", label)
+                
+                if len(by_id) >= target:
+                    skipped = sum(1 for pending, _ in page_futures[position + 1:] if pending.cancel())
+                    self.logger.info(f"🛑 Reached {target} TMDB candidates, skipped {skipped} pending pages")
+                    break
         
-        # Remove duplicates based on tmdb_id
-        unique_candidates = []
-        seen_ids = set()
-        for movie in candidates:
-            if movie['tmdb_id'] not in seen_ids:
-                unique_candidates.append(movie)
-                seen_ids.add(movie['tmdb_id'])
+        unique_candidates = list(by_id.values())
         
         self.logger.info(f"🎬 Total unique TMDB candidates after deduplication: {len(unique_candidates)}")
         return unique_candidates
 
-    def generate_collaborative_recommendations(self, user_data: Dict, candidates: List[Dict]) -> List[Dict]:
+    def generate_collaborative_recommendations(self, user_data: Dict, candidates: List[Dict],
+                                               watched_movies: Optional[frozenset] = None) -> List[Dict]:
         """Generate recommendations using collaborative filtering"""
-        conn = self.get_db_connection()
-        if not conn:
-            return []
-        
-        try:
-            # Build rating matrix from current database
-            rating_matrix, user_to_idx, item_to_idx = self.cf_engine.build_rating_matrix_from_db(conn)
-            
-            if rating_matrix.empty:
-                self.logger.warning("Empty rating matrix, falling back to content-based")
-                return []
-            
-            user_id = user_data['user_id']
-            candidate_movie_ids = [movie['tmdb_id'] for movie in candidates]
-            
-            # Get predictions from both approaches
-            user_based_predictions = self.cf_engine.get_user_based_recommendations(
-                rating_matrix, user_id, candidate_movie_ids, k_neighbors=15
-            )
-            
-            item_based_predictions = self.cf_engine.get_item_based_recommendations(
-                rating_matrix, user_id, candidate_movie_ids, k_neighbors=15
-            )
-            
-            # Combine predictions (weighted average: 60% user-based, 40% item-based)
-            combined_predictions = {}
-            all_predicted_items = set(user_based_predictions.keys()) | set(item_based_predictions.keys())
-            
-            for movie_id in all_predicted_items:
-                user_score = user_based_predictions.get(movie_id, 0)
-                item_score = item_based_predictions.get(movie_id, 0)
+        if watched_movies is None:
+            watched_movies = self._watched_ids(user_data)
+        with self.get_db_connection() as conn:
+            try:
+                # Build rating matrix from current database
+                rating_matrix, user_to_idx, item_to_idx = self.cf_engine.get_rating_matrix(conn)
+            
+                if rating_matrix is None or rating_matrix.nnz == 0:
+                    self.logger.warning("Empty rating matrix, falling back to content-based")
+                    return []
+            
+                user_id = user_data['user_id']
+                candidate_movie_ids = [movie['tmdb_id'] for movie in candidates]
+            
+                # Get predictions from both approaches
+                user_based_predictions = self.cf_engine.get_user_based_recommendations(
+                    rating_matrix, user_to_idx, item_to_idx, user_id, candidate_movie_ids, k_neighbors=15
+                )
+            
+                item_based_predictions = self.cf_engine.get_item_based_recommendations(
+                    rating_matrix, user_to_idx, item_to_idx, user_id, candidate_movie_ids, k_neighbors=15
+                )
+            
+                # Align both prediction maps with the candidate list (candidates are unique by tmdb_id)
+                position = {movie_id: idx for idx, movie_id in enumerate(candidate_movie_ids)}
+                user_scores = np.zeros(len(candidates))
+                item_scores = np.zeros(len(candidates))
+                predicted = np.zeros(len(candidates), dtype=bool)
+                for predictions, scores in ((user_based_predictions, user_scores), (item_based_predictions, item_scores)):
+                    if predictions:
+                        indices = np.fromiter((position[movie_id] for movie_id in predictions), dtype=np.int64, count=len(predictions))
+                        scores[indices] = np.fromiter(predictions.values(), dtype=np.float64, count=len(predictions))
+                        predicted[indices] = True
                 
-                if user_score > 0 and item_score > 0:
-                    combined_score = 0.6 * user_score + 0.4 * item_score
-                elif user_score > 0:
-                    combined_score = user_score * 0.8
-                elif item_score > 0:
-                    combined_score = item_score * 0.8
-                else:
-                    combined_score = 0
+                # Combine predictions (weighted average: 60% user-based, 40% item-based)
+                combined = np.where(
+                    (user_scores > 0) & (item_scores > 0),
+                    0.6 * user_scores + 0.4 * item_scores,
+                    np.where(user_scores > 0, user_scores * 0.8, np.where(item_scores > 0, item_scores * 0.8, 0.0))
+                )
                 
-                combined_predictions[movie_id] = combined_score
-            
-            # Sort by predicted rating
-            sorted_predictions = sorted(combined_predictions.items(), key=lambda x: x[1], reverse=True)
-            
-            # Build recommendation list
-            recommendations = []
-            watched_movies = set(user_data.get('user_history', []))
-            
-            for movie_id, predicted_rating in sorted_predictions:
-                if movie_id not in watched_movies and len(recommendations) < 50:
-                    movie_details = next((m for m in candidates if m['tmdb_id'] == movie_id), None)
-                    if movie_details:
-                        recommendation = {
-                            'tmdb_id': movie_details['tmdb_id'],
-                            'title': movie_details['title'],
-                            'vote_average': movie_details.get('vote_average', 0.0),
-                            'popularity': movie_details.get('popularity', 0.0),
-                            'genres': movie_details.get('genres', []),
-                            'overview': movie_details.get('overview', ''),
-                            'poster_path': movie_details.get('poster_path', ''),
-                            'release_date': movie_details.get('release_date', ''),
-                            'similarity_score': round(predicted_rating / 10.0, 4),  # Normalize to 0-1
-                            'recommendation_reason': f"Collaborative filtering (predicted rating: {predicted_rating:.1f})"
-                        }
-                        recommendations.append(recommendation)
-            
-            return recommendations
+                # Sort by predicted rating and keep the top 50 unwatched movies
+                eligible = np.flatnonzero(predicted & np.fromiter(
+                    (movie_id not in watched_movies for movie_id in candidate_movie_ids), dtype=bool, count=len(candidates)
+                ))
+                top_indices = eligible[_top_k_indices(combined[eligible], 50)]
+            
+                # Build recommendation list
+                recommendations = []
+                for idx in top_indices:
+                    movie_details = candidates[idx]
+                    predicted_rating = float(combined[idx])
+                    recommendation = {
+                        'tmdb_id': movie_details['tmdb_id'],
+                        'title': movie_details['title'],
+                        'vote_average': movie_details.get('vote_average', 0.0),
+                        'popularity': movie_details.get('popularity', 0.0),
+                        'genres': movie_details.get('genres', []),
+                        'overview': movie_details.get('overview', ''),
+                        'poster_path': movie_details.get('poster_path', ''),
+                        'release_date': movie_details.get('release_date', ''),
+                        'similarity_score': round(predicted_rating / 10.0, 4),  # Normalize to 0-1
+                        'recommendation_reason': f"Collaborative filtering (predicted rating: {predicted_rating:.1f})"
+                    }
+                    recommendations.append(recommendation)
+            
+                return recommendations
             
-        except Exception as e:
-            self.logger.error(f"Error in collaborative filtering: {e}")
-            return []
-        finally:
-            conn.close()
+            except Exception as e:
+                self.logger.error(f"Error in collaborative filtering: {e}")
+                return []
 
-    def generate_enhanced_content_recommendations(self, user_data: Dict, candidates: List[Dict]) -> List[Dict]:
+    def generate_enhanced_content_recommendations(self, user_data: Dict, candidates: List[Dict],
+                                                  arrays: Optional[Dict] = None) -> List[Dict]:
         """Generate recommendations using enhanced content-based filtering"""
-        recommendations = []
-        favorite_genres = set(user_data['favourite_genres'])
         mood = user_data['mood']
-        profile_config = user_data.get('profile_config', {})
+        profile_config = self.profile_configs.get(user_data['username'], {})
+        user_genre_mask = profile_config.get('_genre_mask', 0)
+        n_fav = profile_config.get('_n_fav', 0)
+        mood_multiplier = profile_config.get('mood_weights', {}).get(mood, 1.0)
+        
+        if arrays is None:
+            arrays = self._candidate_arrays(candidates, self._watched_ids(user_data))
+        movies = arrays['movies']
+        if not movies:
+            return []
+        
+        votes = arrays['vote_average']
+        popularity = arrays['popularity']
         
-        # Get user's content preferences if enhanced similarity is available
-        user_content_embedding = None
+        # Base score from TMDB metrics
+        scores = np.where(votes > 0, votes / 10.0 * 0.3, 0.0)
+        scores += np.where(popularity > 0, np.minimum(popularity / 100.0, 1.0) * 0.2, 0.0)
+        
+        # Enhanced content similarity, one batched cosine against the user's content vector
         if self.enhanced_content_similarity and user_data.get('user_history'):
             user_content_embedding = self._get_user_content_preferences(user_data)
+            if user_content_embedding is not None:
+                scores += self._calculate_content_similarities(movies, user_content_embedding) * 0.3
         
-        for movie in candidates:
-            if movie['tmdb_id'] in user_data['user_history']:
-                continue
-
-            # Enhanced scoring
-            score = self._calculate_enhanced_movie_score(movie, user_data, user_content_embedding)
-            
-            # Genre matching score
-            movie_genres = set(movie.get('genres', []))
-            genre_overlap = len(movie_genres & favorite_genres)
-            if favorite_genres:
-                genre_score = genre_overlap / len(favorite_genres)
-                score += genre_score * 0.2  # Reduced weight due to enhanced features
-
-            # Mood adjustment
-            mood_weights = profile_config.get('mood_weights', {})
-            mood_multiplier = mood_weights.get(mood, 1.0)
-            score *= mood_multiplier
-
+        # User rating pattern matching
+        ratings = user_data.get('ratings', {})
+        if ratings:
+            avg_user_rating = sum(ratings.values()) / len(ratings)
+            scores += np.maximum(0, 1 - np.abs(votes - avg_user_rating) / 5.0) * 0.2
+        
+        # Genre matching score: overlap of the candidate and profile genre bitmasks
+        genre_overlaps = _genre_overlaps(arrays['genre_mask'], user_genre_mask)
+        if n_fav:
+            scores += genre_overlaps / n_fav * 0.2  # Reduced weight due to enhanced features
+        
+        # Mood adjustment
+        scores *= mood_multiplier
+        scores = np.round(np.minimum(scores, 1.0), 4)
+        
+        # Only materialize the top 50, ties keep candidate order
+        top_indices = _top_k_indices(scores, 50)
+        
+        recommendations = []
+        for idx in top_indices:
+            movie = movies[idx]
             recommendations.append({
                 'tmdb_id': movie['tmdb_id'],
                 'title': movie['title'],
@@ -1067,126 +1807,104 @@ class FireTVRecommendationService:
                 'overview': movie['overview'],
                 'poster_path': movie['poster_path'],
                 'release_date': movie['release_date'],
-                'similarity_score': round(min(score, 1.0), 4),
-                'recommendation_reason': f"Enhanced content-based: {genre_overlap} genre matches, mood: {mood}"
+                'similarity_score': float(scores[idx]),
+                'recommendation_reason': f"Enhanced content-based: {genre_overlaps[idx]} genre matches, mood: {mood}"
             })
+        
+        return recommendations
 
-        # Sort by similarity score
-        recommendations.sort(key=lambda x: x['similarity_score'], reverse=True)
-        return recommendations[:50]
-
-    def _get_user_content_preferences(self, user_data: Dict) -> Optional[np.ndarray]:
-        """Get user's content preferences using SentenceTransformer with caching"""
-        if not self.content_model:
-            return None
+    def _calculate_content_similarities(self, movies: List[Dict], user_content_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every movie against the user's content vector, clipped to [0, 1] (0.5 when unknown)"""
+        similarities = np.full(len(movies), 0.5)
         
         try:
-            # Get details of user's watched movies with caching
-            user_texts = []
-            for movie_id in user_data['user_history'][:20]:  # Limit to recent 20 movies
-                # Use cached movie data if available
-                movie_data = self.cache_manager.get_tmdb_movie(movie_id, self.tmdb_api_key)
-                if movie_data:
-                    text = f"{movie_data['title']}. {movie_data.get('overview', '')}"
-                    user_texts.append(text)
-            
-            if not user_texts:
-                return None
+            embeddings = self.cache_manager.get_embeddings_batch(
+                [_movie_text(movie) for movie in movies], self.content_model
+            )
+            present = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+            if not present:
+                return similarities
             
-            # Use cache manager to get user embeddings
-            user_id = user_data['user_id']
-            user_embedding = self.cache_manager.get_user_embeddings(user_id, user_texts, self.content_model)
+            # Upcast the half-precision cache entries for the dot products
+            movie_matrix = np.stack([embeddings[i] for i in present]).astype(np.float32)
+            user_vector = np.asarray(user_content_embedding, dtype=np.float32)
             
-            return user_embedding
+            norm_products = np.linalg.norm(movie_matrix, axis=1) * np.linalg.norm(user_vector)
+            dots = movie_matrix @ user_vector
             
+            valid = norm_products > 0
+            cosine = np.full(len(present), 0.5)
+            cosine[valid] = np.clip(dots[valid] / norm_products[valid], 0, 1)
+            similarities[present] = cosine
         except Exception as e:
-            self.logger.warning(f"Error generating user content preferences: {e}")
-            return None
-
-    def _calculate_enhanced_movie_score(self, movie: Dict, user_data: Dict, user_content_embedding: Optional[np.ndarray]) -> float:
-        """Calculate enhanced movie score using multiple factors"""
-        score = 0.0
-        
-        # Base score from TMDB metrics
-        if movie['vote_average'] > 0:
-            score += (movie['vote_average'] / 10.0) * 0.3
-        
-        if movie['popularity'] > 0:
-            popularity_score = min(movie['popularity'] / 100.0, 1.0)
-            score += popularity_score * 0.2
-        
-        # Enhanced content similarity
-        if self.enhanced_content_similarity and user_content_embedding is not None:
-            content_score = self._calculate_content_similarity(movie, user_content_embedding)
-            score += content_score * 0.3
-        
-        # User rating pattern matching
-        ratings = user_data.get('ratings', {})
-        if ratings:
-            # Calculate user's average rating preference
-            avg_user_rating = np.mean(list(ratings.values()))
-            rating_diff = abs(movie['vote_average'] - avg_user_rating)
-            rating_score = max(0, 1 - (rating_diff / 5.0))
-            score += rating_score * 0.2
+            self.logger.warning(f"Error calculating content similarity: {e}")
         
-        return score
+        return similarities
 
-    def _calculate_content_similarity(self, movie: Dict, user_content_embedding: np.ndarray) -> float:
-        """Calculate content similarity using SentenceTransformer with caching"""
+    def _get_user_content_preferences(self, user_data: Dict) -> Optional[np.ndarray]:
+        """Get user's content preferences using SentenceTransformer with caching"""
         if not self.content_model:
-            return 0.5
+            return None
         
         try:
-            movie_text = f"{movie['title']}. {movie.get('overview', '')}"
+            history = user_data['user_history'][:20]  # Limit to recent 20 movies
+            user_id = user_data['user_id']
             
-            # Use cache manager to get movie embedding
-            movie_embedding = self.cache_manager.get_embedding(movie_text, self.content_model)
+            def compute_user_embedding():
+                # Get details of user's watched movies with caching (misses are fetched concurrently)
+                user_texts = []
+                for movie_data in self.cache_manager.get_tmdb_movies_batch(history, self.tmdb_api_key):
+                    if movie_data:
+                        user_texts.append(_movie_text(movie_data))
+                
+                if not user_texts:
+                    return None
+                
+                # Use cache manager to get user embeddings
+                return self.cache_manager.get_user_embeddings(user_id, user_texts, self.content_model)
             
-            if movie_embedding is None:
-                return 0.5
+            return self.cache_manager.get_user_history_embedding(user_id, history, compute_user_embedding)
             
-            # Calculate cosine similarity
-            norm_product = np.linalg.norm(movie_embedding) * np.linalg.norm(user_content_embedding)
-            if norm_product == 0:
-                return 0.5
+        except Exception as e:
+            self.logger.warning(f"Error generating user content preferences: {e}")
+            return None
+
+    def _get_cf_global_stats(self) -> Tuple[int, int, int]:
+        """Global rating counts used by the CF readiness check, cached for CF_READINESS_TTL"""
+        with self._cf_stats_lock:
+            cached = self._cf_stats_cache
+            if cached is not None and time.time() - cached[0] < CF_READINESS_TTL:
+                return cached[1]
             
-            similarity = np.dot(movie_embedding, user_content_embedding) / norm_product
-            return max(0, min(1, similarity))
+            with self.get_db_connection() as conn:
+                cursor = conn.cursor()
             
-        except Exception as e:
-            self.logger.warning(f"Error calculating content similarity: {e}")
-            return 0.5
+                # Users with ratings, total ratings and users with sufficient ratings in one scan
+                cursor.execute("""
+                    WITH per_user AS (
+                        SELECT user_id, COUNT(*) AS rating_count
+                        FROM watched_movies 
+                        WHERE rating IS NOT NULL 
+                        GROUP BY user_id
+                    )
+                    SELECT COUNT(*),
+                           COALESCE(SUM(rating_count), 0)::bigint,
+                           COUNT(*) FILTER (WHERE rating_count >= %s)
+                    FROM per_user
+                """, (self.min_ratings_per_user,))
+                stats = tuple(cursor.fetchone())
+            
+            self._cf_stats_cache = (time.time(), stats)
+            return stats
 
     def assess_collaborative_filtering_readiness(self, user_data: Dict) -> Dict:
         """Assess whether the system has enough data for collaborative filtering"""
-        conn = self.get_db_connection()
-        if not conn:
-            return {'use_collaborative': False, 'reason': 'Database connection failed', 'method': 'content-based'}
-        
         try:
-            cursor = conn.cursor()
-            
-            # Count total users with ratings
-            cursor.execute("SELECT COUNT(DISTINCT user_id) FROM watched_movies WHERE rating IS NOT NULL")
-            total_users = cursor.fetchone()[0]
-            
-            # Count total ratings
-            cursor.execute("SELECT COUNT(*) FROM watched_movies WHERE rating IS NOT NULL")
-            total_ratings = cursor.fetchone()[0]
-            
-            # Count users with sufficient ratings
-            cursor.execute("""
-                SELECT COUNT(*) FROM (
-                    SELECT user_id FROM watched_movies 
-                    WHERE rating IS NOT NULL 
-                    GROUP BY user_id 
-                    HAVING COUNT(*) >= %s
-                ) AS users_with_enough_ratings
-            """, (self.min_ratings_per_user,))
-            users_with_enough_ratings = cursor.fetchone()[0]
-            
+            total_users, total_ratings, users_with_enough_ratings = self._get_cf_global_stats()
+        
+            # The current user's count comes from their fresh data, never from the cache
             current_user_ratings = len(user_data.get('ratings', {}))
-            
+        
             # Decision logic - more lenient thresholds
             use_collaborative = (
                 total_users >= self.min_users_for_cf and
@@ -1194,7 +1912,7 @@ class FireTVRecommendationService:
                 users_with_enough_ratings >= 2 and  # At least 2 users with enough ratings
                 current_user_ratings >= self.min_ratings_per_user
             )
-            
+        
             return {
                 'use_collaborative': use_collaborative,
                 'total_users': total_users,
@@ -1205,12 +1923,10 @@ class FireTVRecommendationService:
                 'reason': self._get_cf_decision_reason(use_collaborative, total_users, total_ratings,
                                                     current_user_ratings, users_with_enough_ratings)
             }
-            
+        
         except Exception as e:
             self.logger.error(f"Error assessing CF readiness: {e}")
             return {'use_collaborative': False, 'reason': f'Error: {e}', 'method': 'content-based'}
-        finally:
-            conn.close()
 
     def _get_cf_decision_reason(self, use_cf: bool, total_users: int, total_ratings: int,
                                current_user_ratings: int, users_with_enough_ratings: int) -> str:
@@ -1233,25 +1949,37 @@ class FireTVRecommendationService:
     def generate_recommendations(self, user_data: Dict) -> List[Dict]:
         """Enhanced recommendation generation with guaranteed fallback"""
         start_time = datetime.now()
+        self._initialize_advanced_features()
+        
+        # Every stage filters on the watch history, so build the set once for this run
+        watched = self._watched_ids(user_data)
+        
+        # The CF readiness query doesn't depend on candidates, so run it while TMDB is being fetched
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            cf_readiness_future = executor.submit(self.assess_collaborative_filtering_readiness, user_data)
+            
+            # Get candidate movies (always succeeds with fallback)
+            candidates = self.get_candidate_movies(user_data, watched)
         
-        # Get candidate movies (always succeeds with fallback)
-        candidates = self.get_candidate_movies(user_data)
         if not candidates:
             # Emergency fallback - generate basic movies
             self.logger.warning("No candidates found, using emergency fallback")
-            candidates = self._get_emergency_fallback_movies(user_data)
+            candidates = self._get_emergency_fallback_movies(watched)
         
         self.logger.info(f"📊 Starting recommendation generation with {len(candidates)} candidates")
         
+        # Unwatched candidates as arrays, shared by the content-based passes and the random fallback
+        arrays = self._candidate_arrays(candidates, watched)
+        
         # Try collaborative filtering first
         recommendations = []
         try:
-            cf_readiness = self.assess_collaborative_filtering_readiness(user_data)
+            cf_readiness = cf_readiness_future.result()
             self.logger.info(f"🔍 CF Assessment: {cf_readiness['reason']}")
             
             if cf_readiness['use_collaborative']:
                 self.logger.info("🔄 Attempting Collaborative Filtering")
-                recommendations = self.generate_collaborative_recommendations(user_data, candidates)
+                recommendations = self.generate_collaborative_recommendations(user_data, candidates, watched)
                 
                 if len(recommendations) >= 10:
                     self.logger.info(f"✅ CF generated {len(recommendations)} recommendations")
@@ -1265,7 +1993,7 @@ class FireTVRecommendationService:
         if len(recommendations) < 20:
             self.logger.info("🎯 Using Enhanced Content-Based Filtering")
             try:
-                content_recs = self.generate_enhanced_content_recommendations(user_data, candidates)
+                content_recs = self.generate_enhanced_content_recommendations(user_data, candidates, arrays)
                 
                 # Merge avoiding duplicates
                 existing_ids = {rec['tmdb_id'] for rec in recommendations}
@@ -1280,7 +2008,7 @@ class FireTVRecommendationService:
         if len(recommendations) < 15:
             self.logger.info("🛠️ Using Simple Content-Based Fallback")
             try:
-                simple_recs = self._generate_simple_content_recommendations(user_data, candidates)
+                simple_recs = self._generate_simple_content_recommendations(user_data, candidates, arrays)
                 
                 # Merge avoiding duplicates
                 existing_ids = {rec['tmdb_id'] for rec in recommendations}
@@ -1294,81 +2022,72 @@ class FireTVRecommendationService:
         # Absolute last resort - random selection
         if len(recommendations) < 10:
             self.logger.warning("🚨 Using random selection as last resort")
-            watched_ids = set(user_data.get('user_history', []))
-            for movie in candidates:
-                if movie['tmdb_id'] not in watched_ids and len(recommendations) < 30:
-                    recommendations.append({
-                        'tmdb_id': movie['tmdb_id'],
-                        'title': movie['title'],
-                        'vote_average': movie.get('vote_average', 7.0),
-                        'popularity': movie.get('popularity', 50.0),
-                        'genres': movie.get('genres', []),
-                        'overview': movie.get('overview', ''),
-                        'poster_path': movie.get('poster_path', ''),
-                        'release_date': movie.get('release_date', ''),
-                        'similarity_score': 0.7,  # Default decent score
-                        'recommendation_reason': 'Curated high-quality selection'
-                    })
+            for movie in arrays['movies']:
+                if len(recommendations) >= 30:
+                    break
+                recommendations.append({
+                    'tmdb_id': movie['tmdb_id'],
+                    'title': movie['title'],
+                    'vote_average': movie.get('vote_average', 7.0),
+                    'popularity': movie.get('popularity', 50.0),
+                    'genres': movie.get('genres', []),
+                    'overview': movie.get('overview', ''),
+                    'poster_path': movie.get('poster_path', ''),
+                    'release_date': movie.get('release_date', ''),
+                    'similarity_score': 0.7,  # Default decent score
+                    'recommendation_reason': 'Curated high-quality selection'
+                })
         
         processing_time = (datetime.now() - start_time).total_seconds() * 1000
         self.logger.info(f"✅ Generated {len(recommendations)} recommendations in {processing_time:.0f}ms")
         
         return recommendations[:50]  # Ensure we return at most 50
 
-    def _get_emergency_fallback_movies(self, user_data: Dict) -> List[Dict]:
+    def _get_emergency_fallback_movies(self, user_history: frozenset) -> List[Dict]:
         """Emergency fallback movies when all else fails"""
-        emergency_movies = [
-            {'tmdb_id': 278, 'title': 'The Shawshank Redemption', 'genres': ['Drama'], 'vote_average': 9.3, 'popularity': 96.7, 'overview': 'Two imprisoned men bond over years, finding solace and eventual redemption through acts of common decency.', 'release_date': '1994-09-23', 'poster_path': '/q6y0Go1tsGEsmtFryDOJo3dEmqu.jpg', 'runtime': 142},
-            {'tmdb_id': 238, 'title': 'The Godfather', 'genres': ['Crime', 'Drama'], 'vote_average': 9.2, 'popularity': 91.7, 'overview': 'The aging patriarch of an organized crime dynasty transfers control to his reluctant son.', 'release_date': '1972-03-14', 'poster_path': '/3bhkrj58Vtu7enYsRolD1fZdja1.jpg', 'runtime': 175},
-            {'tmdb_id': 155, 'title': 'The Dark Knight', 'genres': ['Action', 'Crime', 'Drama'], 'vote_average': 9.0, 'popularity': 98.5, 'overview': 'When the menace known as the Joker wreaks havoc on Gotham, Batman must accept one of the greatest psychological and physical tests.', 'release_date': '2008-07-18', 'poster_path': '/qJ2tW6WMUDux911r6m7haRef0WH.jpg', 'runtime': 152},
-            {'tmdb_id': 603, 'title': 'The Matrix', 'genres': ['Action', 'Science Fiction'], 'vote_average': 8.7, 'popularity': 93.8, 'overview': 'A computer hacker learns from mysterious rebels about the true nature of his reality.', 'release_date': '1999-03-30', 'poster_path': '/f89U3ADr1oiB1s9GkdPOEpXUk5H.jpg', 'runtime': 136},
-            {'tmdb_id': 13, 'title': 'Forrest Gump', 'genres': ['Comedy', 'Drama'], 'vote_average': 8.5, 'popularity': 89.3, 'overview': 'The presidencies of Kennedy and Johnson, Vietnam, Watergate, and other history unfold through the perspective of an Alabama man.', 'release_date': '1994-07-06', 'poster_path': '/arw2vcBveWOVZr6pxd9XTd1TdQa.jpg', 'runtime': 142}
-        ]
-        
-        user_history = set(user_data.get('user_history', []))
-        return [movie for movie in emergency_movies if movie['tmdb_id'] not in user_history]
+        return [movie for movie in EMERGENCY_FALLBACK_MOVIES if movie['tmdb_id'] not in user_history]
 
-    def _generate_simple_content_recommendations(self, user_data: Dict, candidates: List[Dict]) -> List[Dict]:
+    def _generate_simple_content_recommendations(self, user_data: Dict, candidates: List[Dict],
+                                                 arrays: Optional[Dict] = None) -> List[Dict]:
         """Simple content-based recommendations that always work"""
-        recommendations = []
-        favorite_genres = set(user_data['favourite_genres'])
         mood = user_data['mood']
-        profile_config = user_data.get('profile_config', {})
+        profile_config = self.profile_configs.get(user_data['username'], {})
+        user_genre_mask = profile_config.get('_genre_mask', 0)
+        n_fav = profile_config.get('_n_fav', 0)
+        mood_multiplier = profile_config.get('mood_weights', {}).get(mood, 1.0)
+        
+        if arrays is None:
+            arrays = self._candidate_arrays(candidates, self._watched_ids(user_data))
+        movies = arrays['movies']
+        if not movies:
+            return []
         
-        for movie in candidates:
-            if movie['tmdb_id'] in user_data['user_history']:
-                continue
-            
-            # Simple scoring
-            score = 0.0
-            
-            # Vote average score (40% weight)
-            if movie.get('vote_average', 0) > 0:
-                score += (movie['vote_average'] / 10.0) * 0.4
-            else:
-                score += 0.28  # Default decent score
-            
-            # Popularity score (20% weight)
-            if movie.get('popularity', 0) > 0:
-                popularity_score = min(movie['popularity'] / 100.0, 1.0)
-                score += popularity_score * 0.2
-            else:
-                score += 0.1  # Default
-            
-            # Genre matching (40% weight)
-            movie_genres = set(movie.get('genres', []))
-            if favorite_genres:
-                genre_overlap = len(movie_genres & favorite_genres)
-                genre_score = genre_overlap / len(favorite_genres)
-                score += genre_score * 0.4
-            else:
-                score += 0.2  # Default when no genre preferences
-            
-            # Mood adjustment
-            mood_weights = profile_config.get('mood_weights', {})
-            mood_multiplier = mood_weights.get(mood, 1.0)
-            score *= mood_multiplier
-            
+        votes = arrays['vote_average']
+        popularity = arrays['popularity']
+        
+        # Vote average score (40% weight), default decent score when missing
+        scores = np.where(votes > 0, votes / 10.0 * 0.4, 0.28)
+        
+        # Popularity score (20% weight)
+        scores += np.where(popularity > 0, np.minimum(popularity / 100.0, 1.0) * 0.2, 0.1)
+        
+        # Genre matching (40% weight)
+        if n_fav:
+            genre_overlaps = _genre_overlaps(arrays['genre_mask'], user_genre_mask)
+            scores += genre_overlaps / n_fav * 0.4
+        else:
+            scores += 0.2  # Default when no genre preferences
+        
+        # Mood adjustment
+        scores *= mood_multiplier
+        scores = np.round(np.minimum(scores, 1.0), 4)
+        
+        # Only materialize the top 50, ties keep candidate order
+        top_indices = _top_k_indices(scores, 50)
+        
+        recommendations = []
+        for idx in top_indices:
+            movie = movies[idx]
             recommendations.append({
                 'tmdb_id': movie['tmdb_id'],
                 'title': movie['title'],
@@ -1378,156 +2097,237 @@ class FireTVRecommendationService:
                 'overview': movie.get('overview', ''),
                 'poster_path': movie.get('poster_path', ''),
                 'release_date': movie.get('release_date', ''),
-                'similarity_score': round(min(score, 1.0), 4),
+                'similarity_score': float(scores[idx]),
                 'recommendation_reason': f"Simple content-based: genre preferences, mood: {mood}"
             })
         
-        # Sort by similarity score
-        recommendations.sort(key=lambda x: x['similarity_score'], reverse=True)
-        return recommendations[:50]
+        return recommendations
+
+    def _build_recommendation_columns(self, recommendations: List[Dict], default_reason: str) -> List[List]:
+        """Convert recommendations into the nine column arrays taken by the UNNEST upserts"""
+        # Keyed by tmdb_id: a single bulk upsert can't touch the same row twice
+        rows = {}
+        for rec in recommendations:
+            rows[int(rec['tmdb_id'])] = (
+                int(rec['tmdb_id']),
+                str(rec['title']),
+                # Encoded to a text[] literal once here rather than adapted per row by psycopg2
+                _pg_text_array(rec.get('genres', [])),
+                _to_float(rec.get('vote_average'), 7.0),
+                _to_float(rec.get('popularity'), 50.0),
+                str(rec.get('overview', '')),
+                str(rec.get('poster_path', '')),
+                _to_float(rec.get('similarity_score'), 0.5),
+                str(rec.get('recommendation_reason', default_reason))
+            )
+        
+        return [list(column) for column in zip(*rows.values())]
 
-    # Keep all existing methods unchanged for backward compatibility
-    def store_recommendations_to_profile(self, username: str, recommendations: List[Dict]) -> bool:
-        """Store recommendations to the profile-specific table (unchanged)"""
+    def store_recommendations_to_profile(self, username: str, recommendations: List[Dict],
+                                         state_hash: Optional[bytes] = None) -> bool:
+        """Replace a profile's recommendations with a single bulk upsert, recording the state hash in the same transaction"""
         if username not in self.profile_configs:
             self.logger.error(f"Unknown profile: {username}")
             return False
 
-        table_name = self.profile_configs[username]['table_name']
-        conn = self.get_db_connection()
-        if not conn:
-            return False
-
-        try:
-            cursor = conn.cursor()
-            cursor.execute(f"DELETE FROM {table_name} WHERE is_active = TRUE")
-
-            insert_query = f"""
-                INSERT INTO {table_name}
-                (tmdb_id, title, genres, vote_average, popularity, overview,
-                 poster_path, similarity_score, recommendation_reason)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (tmdb_id) DO UPDATE SET
-                title = EXCLUDED.title,
-                similarity_score = EXCLUDED.similarity_score,
-                recommendation_reason = EXCLUDED.recommendation_reason,
-                added_at = CURRENT_TIMESTAMP,
-                is_active = TRUE
-            """
-
-            for rec in recommendations:
-                # Convert numpy types to native Python types
-                vote_average = rec.get('vote_average')
-                if hasattr(vote_average, 'item'):  # numpy scalar
-                    vote_average = float(vote_average.item())
-                elif vote_average is None:
-                    vote_average = 7.0
-                else:
-                    vote_average = float(vote_average)
-                
-                popularity = rec.get('popularity')
-                if hasattr(popularity, 'item'):  # numpy scalar
-                    popularity = float(popularity.item())
-                elif popularity is None:
-                    popularity = 50.0
-                else:
-                    popularity = float(popularity)
-                
-                similarity_score = rec.get('similarity_score')
-                if hasattr(similarity_score, 'item'):  # numpy scalar
-                    similarity_score = float(similarity_score.item())
-                elif similarity_score is None:
-                    similarity_score = 0.5
-                else:
-                    similarity_score = float(similarity_score)
-                
-                cursor.execute(insert_query, (
-                    int(rec['tmdb_id']),
-                    str(rec['title']),
-                    rec.get('genres', []),
-                    vote_average,
-                    popularity,
-                    str(rec.get('overview', '')),
-                    str(rec.get('poster_path', '')),
-                    similarity_score,
-                    str(rec.get('recommendation_reason', 'Enhanced recommendation'))
-                ))
-
-            conn.commit()
-            self.logger.info(f"Stored {len(recommendations)} recommendations for {username}")
-            return True
+        profile_config = self.profile_configs[username]
+        with self.get_db_connection() as conn:
+            try:
+                cursor = conn.cursor()
+                # Profile tables are rebuildable caches: don't wait on the WAL flush at commit.
+                # A crash can lose the last refresh (and its state hash with it), never corrupt it.
+                cursor.execute("SET LOCAL synchronous_commit = OFF")
+                cursor.execute(profile_config['_delete_sql'])
+
+                # DELETE + bulk upsert share one transaction, so the refresh is atomic;
+                # rows go over as nine column arrays in a single UNNEST statement
+                columns = self._build_recommendation_columns(recommendations, 'Enhanced recommendation')
+                if columns:
+                    self._execute_prepared(cursor, profile_config['_insert_stmt'], columns,
+                                           profile_config['_insert_sql'])
+
+                # Record what this refresh was computed from, in the same transaction
+                if state_hash is not None and self._state_table_ready:
+                    cursor.execute("""
+                        INSERT INTO recommendation_state (username, state_hash, refreshed_at)
+                        VALUES (%s, %s, CURRENT_TIMESTAMP)
+                        ON CONFLICT (username) DO UPDATE SET
+                        state_hash = EXCLUDED.state_hash,
+                        refreshed_at = EXCLUDED.refreshed_at
+                    """, (username, psycopg2.Binary(state_hash)))
+
+                conn.commit()
+                self.logger.info("Stored %d recommendations for %s", len(recommendations), username)
+                return True
 
-        except Exception as e:
-            self.logger.error(f"Error storing recommendations: {e}")
-            conn.rollback()
-            return False
-        finally:
-            conn.close()
+            except Exception as e:
+                self.logger.error(f"Error storing recommendations: {e}")
+                conn.rollback()
+                return False
 
     def get_profile_recommendations(self, username: str, limit: int = 50, shuffle: bool = True) -> List[Dict]:
-        """Get current recommendations for a profile from database (unchanged)"""
+        """Get current recommendations for a profile from database"""
         if username not in self.profile_configs:
             return []
 
-        table_name = self.profile_configs[username]['table_name']
-        conn = self.get_db_connection()
-        if not conn:
-            return []
+        with self.get_db_connection() as conn:
+            try:
+                cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                cursor.execute(self.profile_configs[username]['_select_sql'], (limit,))
 
-        try:
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            cursor.execute(f"""
-                SELECT tmdb_id, title, genres, vote_average, popularity,
-                       overview, poster_path, similarity_score, added_at
-                FROM {table_name}
-                WHERE is_active = TRUE
-                ORDER BY similarity_score DESC, added_at DESC
-                LIMIT %s
-            """, (limit,))
+                recommendations = [dict(rec) for rec in cursor.fetchall()]
 
-            recommendations = [dict(rec) for rec in cursor.fetchall()]
+                if shuffle:
+                    random.shuffle(recommendations)
 
-            if shuffle and recommendations:
-                random.shuffle(recommendations)
-                self.logger.info(f"Shuffled {len(recommendations)} recommendations for random display")
+                return recommendations
 
-            return recommendations
+            except Exception as e:
+                self.logger.error(f"Error fetching recommendations for {username}: {e}")
+                return []
 
-        except Exception as e:
-            self.logger.error(f"Error fetching recommendations for {username}: {e}")
-            return []
-        finally:
-            conn.close()
+    def _compute_state_hash(self, user_data: Dict) -> bytes:
+        """Hash everything a refresh depends on: watch history, ratings, mood and preferred genres"""
+        state = [
+            sorted(user_data.get('user_history', [])),
+            sorted(user_data.get('ratings', {}).items()),
+            user_data.get('mood'),
+            user_data.get('favourite_genres', [])
+        ]
+        return hashlib.blake2b(json.dumps(state).encode(), digest_size=16).digest()
 
-    def refresh_recommendations_for_profile(self, username: str) -> bool:
-        """Main function to refresh recommendations for a profile (enhanced)"""
-        self.logger.info(f"🚀 Refreshing enhanced recommendations for {username}")
-        start_time = datetime.now()
+    def _ensure_state_table(self):
+        """Create the recommendation_state table on first use"""
+        if self._state_table_ready:
+            return
+        
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS recommendation_state (
+                    username VARCHAR(50) PRIMARY KEY,
+                    state_hash BYTEA NOT NULL,
+                    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+        self._state_table_ready = True
 
-        user_data = self.get_user_data_from_backend(username)
+    def _get_stored_state_hash(self, username: str) -> Optional[bytes]:
+        """Get the state hash recorded by the last successful refresh of a profile"""
+        try:
+            self._ensure_state_table()
+            with self.get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT state_hash FROM recommendation_state WHERE username = %s", (username,))
+                row = cursor.fetchone()
+                return bytes(row[0]) if row else None
+        except Exception as e:
+            self.logger.warning(f"⚠️ Could not read recommendation state for {username}: {e}")
+            return None
+
+    def _clear_state_hash(self, cursor, username: str):
+        """Forget the stored state so the next refresh recomputes (profile table changed outside a refresh)"""
+        # add/dislike usually run in a fresh CLI process that has never touched the state table
+        self._ensure_state_table()
+        cursor.execute("DELETE FROM recommendation_state WHERE username = %s", (username,))
+
+    def _load_profile_state(self, username: str) -> Optional[Tuple[Dict, bytes, bool]]:
+        """User data, its state hash and whether that matches the last refresh (None when there is no user data)"""
+        # The backend spawns a refresh right after a movie is watched; the cached copy would still
+        # hold the pre-watch history and hash as unchanged for up to USER_DATA_TTL
+        user_data = self.get_user_data_from_backend(username, fresh=True)
         if not user_data:
             self.logger.error(f"No user data found for {username}")
-            return False
+            return None
 
+        state_hash = self._compute_state_hash(user_data)
+        return user_data, state_hash, self._get_stored_state_hash(username) == state_hash
+
+    def _regenerate_profile(self, username: str, user_data: Dict, state_hash: bytes, start_time: datetime) -> bool:
+        """Generate and store fresh recommendations for a profile whose state has changed"""
         recommendations = self.generate_recommendations(user_data)
         if not recommendations:
             self.logger.warning(f"No recommendations generated for {username}")
             return False
 
-        success = self.store_recommendations_to_profile(username, recommendations)
+        success = self.store_recommendations_to_profile(username, recommendations, state_hash)
         if success:
             processing_time = (datetime.now() - start_time).total_seconds() * 1000
             self.logger.info(f"✅ Successfully refreshed enhanced recommendations for {username} in {processing_time:.0f}ms")
 
         return success
 
-    # Keep all other existing methods unchanged for backward compatibility
+    def refresh_recommendations_for_profile(self, username: str) -> bool:
+        """Main function to refresh recommendations for a profile (enhanced)"""
+        self.logger.info(f"🚀 Refreshing enhanced recommendations for {username}")
+        start_time = datetime.now()
+
+        profile_state = self._load_profile_state(username)
+        if profile_state is None:
+            return False
+
+        # Nothing the recommendations depend on has changed since the last refresh
+        user_data, state_hash, unchanged = profile_state
+        if unchanged:
+            self.logger.info(f"⏭️ Watch history and mood unchanged for {username}, keeping current recommendations")
+            return True
+
+        return self._regenerate_profile(username, user_data, state_hash, start_time)
+
     def refresh_all_profiles(self) -> Dict[str, bool]:
         """Refresh recommendations for all profiles"""
+        start_time = datetime.now()
+        profiles = list(self.profile_configs.keys())
         results = {}
-        for profile in self.profile_configs.keys():
-            results[profile] = self.refresh_recommendations_for_profile(profile)
-        return results
+        
+        # Profiles are independent; run them concurrently (the shared token bucket caps TMDB QPS)
+        with ThreadPoolExecutor(max_workers=len(profiles)) as executor:
+            # Check every profile's state first so unchanged profiles cost no TMDB traffic
+            state_futures = {profile: executor.submit(self._load_profile_state, profile) for profile in profiles}
+            stale = {}
+            for profile, future in state_futures.items():
+                try:
+                    profile_state = future.result()
+                except Exception as e:
+                    self.logger.error(f"❌ Refresh failed for {profile}: {e}")
+                    profile_state = None
+                if profile_state is None:
+                    results[profile] = False
+                elif profile_state[2]:
+                    self.logger.info(f"⏭️ Watch history and mood unchanged for {profile}, keeping current recommendations")
+                    results[profile] = True
+                else:
+                    stale[profile] = profile_state
+            
+            # List pages are shared by the profiles of this run only, so every run starts from fresh pages
+            self._list_pages = {}
+            try:
+                if stale:
+                    # Warm the pages for the union of the stale profiles' genres once. No candidate cap:
+                    # stopping early would cancel later genres' pages that each profile then re-fetches.
+                    # The work is bounded by the page list (fixed endpoints plus three pages per genre).
+                    genre_ids = list(dict.fromkeys(
+                        genre_id for profile in stale for genre_id in self.profile_configs[profile]['_genre_ids']
+                    ))
+                    self._try_fetch_tmdb_candidates(genre_ids, set(), target=sys.maxsize)
+                
+                futures = {
+                    executor.submit(self._regenerate_profile, profile, user_data, state_hash, start_time): profile
+                    for profile, (user_data, state_hash, _) in stale.items()
+                }
+                for future in as_completed(futures):
+                    profile = futures[future]
+                    try:
+                        results[profile] = future.result()
+                    except Exception as e:
+                        self.logger.error(f"❌ Refresh failed for {profile}: {e}")
+                        results[profile] = False
+            finally:
+                self._list_pages = None
+        
+        # Report in profile order regardless of completion order
+        return {profile: results[profile] for profile in profiles}
 
     def add_incremental_recommendations(self, username: str, count: int = 10) -> bool:
         """Generate and add NEW recommendations when user watches a movie (enhanced with cache invalidation)"""
@@ -1542,9 +2342,6 @@ class FireTVRecommendationService:
             self.logger.error(f"No user data found for {username}")
             return False
 
-        existing_recs = self.get_profile_recommendations(username, limit=1000)
-        existing_tmdb_ids = {rec['tmdb_id'] for rec in existing_recs}
-
         user_data['count'] = count * 3
 
         new_recommendations = self.generate_recommendations(user_data)
@@ -1552,170 +2349,131 @@ class FireTVRecommendationService:
             self.logger.warning(f"No new recommendations generated for {username}")
             return False
 
-        filtered_recs = []
-        for rec in new_recommendations:
-            if rec['tmdb_id'] not in existing_tmdb_ids and len(filtered_recs) < count:
-                filtered_recs.append(rec)
-
-        if not filtered_recs:
-            self.logger.warning(f"No new unique recommendations found for {username}")
-            return False
-
-        success = self.add_recommendations_to_profile(username, filtered_recs)
+        # Recommendations already in the profile are skipped by the INSERT itself
+        success = self.add_recommendations_to_profile(username, new_recommendations, new_only_limit=count)
         if success:
             processing_time = (datetime.now() - start_time).total_seconds() * 1000
-            self.logger.info(f"✅ Successfully added {len(filtered_recs)} enhanced recommendations for {username} in {processing_time:.0f}ms")
+            self.logger.info(f"✅ Successfully added enhanced recommendations for {username} in {processing_time:.0f}ms")
 
         return success
 
-    def add_recommendations_to_profile(self, username: str, recommendations: List[Dict]) -> bool:
-        """Add new recommendations to profile table WITHOUT clearing existing ones (unchanged)"""
+    def add_recommendations_to_profile(self, username: str, recommendations: List[Dict],
+                                       new_only_limit: Optional[int] = None) -> bool:
+        """Add new recommendations to profile table WITHOUT clearing existing ones
+        
+        With ``new_only_limit``, only the first that many recommendations not already active
+        in the profile are written; the filtering happens in the INSERT itself.
+        """
         if username not in self.profile_configs:
             self.logger.error(f"Unknown profile: {username}")
             return False
 
-        table_name = self.profile_configs[username]['table_name']
-        conn = self.get_db_connection()
-        if not conn:
-            return False
-
-        try:
-            cursor = conn.cursor()
-
-            insert_query = f"""
-                INSERT INTO {table_name}
-                (tmdb_id, title, genres, vote_average, popularity, overview,
-                 poster_path, similarity_score, recommendation_reason)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (tmdb_id) DO UPDATE SET
-                similarity_score = EXCLUDED.similarity_score,
-                recommendation_reason = EXCLUDED.recommendation_reason,
-                added_at = CURRENT_TIMESTAMP,
-                is_active = TRUE
-            """
-
-            for rec in recommendations:
-                # Convert numpy types to native Python types
-                vote_average = rec.get('vote_average')
-                if hasattr(vote_average, 'item'):  # numpy scalar
-                    vote_average = float(vote_average.item())
-                elif vote_average is None:
-                    vote_average = 7.0
-                else:
-                    vote_average = float(vote_average)
-                
-                popularity = rec.get('popularity')
-                if hasattr(popularity, 'item'):  # numpy scalar
-                    popularity = float(popularity.item())
-                elif popularity is None:
-                    popularity = 50.0
-                else:
-                    popularity = float(popularity)
-                
-                similarity_score = rec.get('similarity_score')
-                if hasattr(similarity_score, 'item'):  # numpy scalar
-                    similarity_score = float(similarity_score.item())
-                elif similarity_score is None:
-                    similarity_score = 0.5
-                else:
-                    similarity_score = float(similarity_score)
+        profile_config = self.profile_configs[username]
+        with self.get_db_connection() as conn:
+            try:
+                cursor = conn.cursor()
+                # Rebuildable data, same durability trade-off as store_recommendations_to_profile
+                cursor.execute("SET LOCAL synchronous_commit = OFF")
                 
-                cursor.execute(insert_query, (
-                    int(rec['tmdb_id']),
-                    str(rec['title']),
-                    rec.get('genres', []),
-                    vote_average,
-                    popularity,
-                    str(rec.get('overview', '')),
-                    str(rec.get('poster_path', '')),
-                    similarity_score,
-                    str(rec.get('recommendation_reason', 'Enhanced incremental recommendation'))
-                ))
+                columns = self._build_recommendation_columns(recommendations, 'Enhanced incremental recommendation')
+                added = 0
+                if columns and new_only_limit is not None:
+                    self._execute_prepared(cursor, profile_config['_append_new_stmt'], columns + [new_only_limit],
+                                           profile_config['_append_new_sql'])
+                    added = cursor.rowcount
+                elif columns:
+                    self._execute_prepared(cursor, profile_config['_append_stmt'], columns,
+                                           profile_config['_append_sql'])
+                    added = cursor.rowcount
+
+                if not added:
+                    conn.rollback()
+                    self.logger.warning(f"No new unique recommendations found for {username}")
+                    return False
+
+                self._clear_state_hash(cursor, username)
+                conn.commit()
+                self.logger.info("Added %d enhanced recommendations for %s", added, username)
+                return True
 
-            conn.commit()
-            self.logger.info(f"Added {len(recommendations)} enhanced recommendations for {username}")
-            return True
-
-        except Exception as e:
-            self.logger.error(f"Error adding recommendations: {e}")
-            conn.rollback()
-            return False
-        finally:
-            conn.close()
+            except Exception as e:
+                self.logger.error(f"Error adding recommendations: {e}")
+                conn.rollback()
+                return False
 
     def handle_movie_dislike(self, username: str, tmdb_id: int) -> bool:
-        """Remove or deprioritize a disliked movie from recommendations (unchanged)"""
+        """Deactivate a disliked movie and demote active recommendations that share its genres"""
         if username not in self.profile_configs:
             self.logger.error(f"Unknown profile: {username}")
             return False
 
         table_name = self.profile_configs[username]['table_name']
-        conn = self.get_db_connection()
-        if not conn:
-            return False
-
-        try:
-            cursor = conn.cursor()
-            cursor.execute(f"UPDATE {table_name} SET is_active = FALSE WHERE tmdb_id = %s", (tmdb_id,))
-
-            cursor.execute(f"""
-                UPDATE {table_name}
-                SET similarity_score = similarity_score * 0.7,
-                    recommendation_reason = recommendation_reason || ' (Reduced due to dislike)'
-                WHERE tmdb_id != %s
-                  AND genres && (SELECT genres FROM {table_name} WHERE tmdb_id = %s LIMIT 1)
-                  AND is_active = TRUE
-            """, (tmdb_id, tmdb_id))
-
-            conn.commit()
-            self.logger.info(f"Handled dislike for movie {tmdb_id} in {username}'s profile")
-            return True
+        with self.get_db_connection() as conn:
+            try:
+                cursor = conn.cursor()
+                # Deactivate the movie and demote its genre neighbours in one statement; both
+                # parts see the same snapshot, so the disliked genres are looked up once
+                cursor.execute(f"""
+                    WITH disliked AS (
+                        SELECT genres FROM {table_name} WHERE tmdb_id = %(tmdb_id)s LIMIT 1
+                    ),
+                    deactivated AS (
+                        UPDATE {table_name} SET is_active = FALSE WHERE tmdb_id = %(tmdb_id)s
+                    )
+                    UPDATE {table_name}
+                    SET similarity_score = similarity_score * 0.7,
+                        recommendation_reason = recommendation_reason || ' (Reduced due to dislike)'
+                    WHERE tmdb_id != %(tmdb_id)s
+                      AND genres && (SELECT genres FROM disliked)
+                      AND is_active = TRUE
+                """, {'tmdb_id': tmdb_id})
+
+                self._clear_state_hash(cursor, username)
+                conn.commit()
+                self.logger.info("Handled dislike for movie %s in %s's profile", tmdb_id, username)
+                return True
 
-        except Exception as e:
-            self.logger.error(f"Error handling dislike: {e}")
-            conn.rollback()
-            return False
-        finally:
-            conn.close()
+            except Exception as e:
+                self.logger.error(f"Error handling dislike: {e}")
+                conn.rollback()
+                return False
 
     def get_profile_stats(self, username: str) -> Dict:
-        """Get statistics about a profile's recommendations (unchanged)"""
+        """Get statistics about a profile's recommendations"""
         if username not in self.profile_configs:
             return {}
 
         table_name = self.profile_configs[username]['table_name']
-        conn = self.get_db_connection()
-        if not conn:
-            return {}
-
-        try:
-            cursor = conn.cursor()
-
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name} WHERE is_active = TRUE")
-            active_count = cursor.fetchone()[0]
-
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            total_count = cursor.fetchone()[0]
+        with self.get_db_connection() as conn:
+            try:
+                cursor = conn.cursor()
 
-            cursor.execute(f"SELECT AVG(similarity_score) FROM {table_name} WHERE is_active = TRUE")
-            avg_score = cursor.fetchone()[0] or 0
+                # Active count, total count and active average in a single scan
+                cursor.execute(f"""
+                    SELECT COUNT(*) FILTER (WHERE is_active = TRUE),
+                           COUNT(*),
+                           COALESCE(AVG(similarity_score) FILTER (WHERE is_active = TRUE), 0)
+                    FROM {table_name}
+                """)
+                active_count, total_count, avg_score = cursor.fetchone()
 
-            return {
-                'active_recommendations': active_count,
-                'total_recommendations': total_count,
-                'average_similarity_score': float(avg_score),
-                'growth': active_count - 30
-            }
+                return {
+                    'active_recommendations': active_count,
+                    'total_recommendations': total_count,
+                    'average_similarity_score': float(avg_score),
+                    'growth': active_count - 30
+                }
 
-        except Exception as e:
-            self.logger.error(f"Error getting profile stats: {e}")
-            return {}
-        finally:
-            conn.close()
+            except Exception as e:
+                self.logger.error(f"Error getting profile stats: {e}")
+                return {}
 
     def __del__(self):
-        """Cleanup GPU memory when object is destroyed"""
-        if hasattr(self, 'device') and TORCH_AVAILABLE:
+        """Cleanup GPU memory and pooled connections when object is destroyed"""
+        if getattr(self, 'db_pool', None) is not None:
+            self.db_pool.closeall()
+        
+        if hasattr(self, 'device') and torch is not None:
             if str(self.device) != 'cpu':
                 torch.cuda.empty_cache()
 
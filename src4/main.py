@@ -4,6 +4,7 @@ Hybrid Movie Recommendation Engine with Collaborative Filtering
 Handles Cold Start with Content-Based, switches to Collaborative Filtering when data is sufficient
 """
 
+import heapq
 import numpy as np
 import requests
 from datetime import datetime
@@ -11,7 +12,6 @@ from typing import Dict, List, Optional, Tuple
 from collections import Counter, defaultdict
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
-from scipy.stats import pearsonr
 import pandas as pd
 
 class CollaborativeFilteringEngine:
@@ -67,15 +67,16 @@ class CollaborativeFilteringEngine:
         if common_items.sum() < self.min_common_items:
             return 0.0
         
-        user1_common = user1_ratings[common_items]
-        user2_common = user2_ratings[common_items]
+        x = user1_ratings[common_items].to_numpy()
+        y = user2_ratings[common_items].to_numpy()
         
-        # Calculate Pearson correlation
-        try:
-            correlation, _ = pearsonr(user1_common, user2_common)
-            return correlation if not np.isnan(correlation) else 0.0
-        except:
+        # Calculate Pearson correlation (no p-value needed; constant ratings have no correlation)
+        x = x - x.mean()
+        y = y - y.mean()
+        denominator = np.sqrt((x * x).sum() * (y * y).sum())
+        if denominator == 0:
             return 0.0
+        return float(np.clip((x * y).sum() / denominator, -1.0, 1.0))
     
     def calculate_item_similarity(self, rating_matrix: pd.DataFrame, item_id: int, target_item_id: int) -> float:
         """Calculate similarity between two items using cosine similarity"""
@@ -118,9 +119,8 @@ class CollaborativeFilteringEngine:
                 if similarity > 0:
                     user_similarities.append((other_user_id, similarity))
         
-        # Sort by similarity and take top k
-        user_similarities.sort(key=lambda x: x[1], reverse=True)
-        top_similar_users = user_similarities[:k_neighbors]
+        # Take the top k by similarity (same order as a full sort, without sorting everything)
+        top_similar_users = heapq.nlargest(k_neighbors, user_similarities, key=lambda x: x[1])
         
         if not top_similar_users:
             return {}
@@ -175,9 +175,8 @@ class CollaborativeFilteringEngine:
                 if similarity > 0:
                     item_similarities.append((rated_movie_id, similarity))
             
-            # Sort by similarity and take top k
-            item_similarities.sort(key=lambda x: x[1], reverse=True)
-            top_similar_items = item_similarities[:k_neighbors]
+            # Take the top k by similarity (same order as a full sort, without sorting everything)
+            top_similar_items = heapq.nlargest(k_neighbors, item_similarities, key=lambda x: x[1])
             
             if not top_similar_items:
                 continue
@@ -394,10 +393,15 @@ class HybridRecommendationEngine:
             recommendations = []
             watched_movies = set(user_data.get('user_history', []))
             
+            # id -> movie, first occurrence wins (same as the linear search it replaces)
+            candidates_by_id = {}
+            for movie in candidate_movies:
+                candidates_by_id.setdefault(movie['id'], movie)
+            
             for movie_id, predicted_rating in sorted_predictions:
                 if movie_id not in watched_movies and len(recommendations) < count:
                     # Find movie details
-                    movie_details = next((m for m in candidate_movies if m['id'] == movie_id), None)
+                    movie_details = candidates_by_id.get(movie_id)
                     if movie_details:
                         recommendation = {
                             'tmdb_id': movie_details['id'],
@@ -427,10 +431,15 @@ class HybridRecommendationEngine:
                 user_history, ratings, favourite_genres, mood, time_watched
             )
             
+            # Content similarity for all candidates in one batched encode + matrix-vector product
+            content_scores = self._calculate_content_similarities(
+                candidate_movies, user_preferences['content_embedding']
+            )
+            
             # Score all candidates
             scored_movies = []
-            for movie in candidate_movies:
-                score = self._score_movie(movie, user_preferences)
+            for movie, content_score in zip(candidate_movies, content_scores):
+                score = self._score_movie(movie, user_preferences, content_score=float(content_score))
                 
                 recommendation = {
                     'tmdb_id': movie['id'],
@@ -449,10 +458,8 @@ class HybridRecommendationEngine:
             watched_ids = set(user_history)
             filtered_movies = [movie for movie in scored_movies if movie['tmdb_id'] not in watched_ids]
             
-            # Sort by similarity score and return top recommendations
-            filtered_movies.sort(key=lambda x: x['similarity_score'], reverse=True)
-            
-            return filtered_movies[:count]
+            # Return the top recommendations by similarity score
+            return heapq.nlargest(count, filtered_movies, key=lambda x: x['similarity_score'])
             
         except Exception as e:
             print(f"❌ Error in content-based filtering: {e}")
@@ -616,11 +623,11 @@ class HybridRecommendationEngine:
         }
         return time_mappings.get(time_watched, {})
     
-    def _score_movie(self, movie: Dict, user_preferences: Dict) -> float:
-        """Score a movie against user preferences"""
+    def _score_movie(self, movie: Dict, user_preferences: Dict, content_score: Optional[float] = None) -> float:
+        """Score a movie against user preferences (content_score may be precomputed in batch)"""
         try:
             # Extract movie features
-            movie_features = self._extract_movie_features(movie)
+            movie_features = self._extract_movie_features(movie, encode_content=content_score is None)
             
             # Calculate individual scores
             genre_score = self._calculate_genre_similarity(
@@ -628,10 +635,11 @@ class HybridRecommendationEngine:
                 user_preferences['genre_vector']
             )
             
-            content_score = self._calculate_content_similarity(
-                movie_features['content_embedding'], 
-                user_preferences['content_embedding']
-            )
+            if content_score is None:
+                content_score = self._calculate_content_similarity(
+                    movie_features['content_embedding'], 
+                    user_preferences['content_embedding']
+                )
             
             quality_score = self._calculate_quality_match(
                 movie_features['quality_metrics'], 
@@ -668,7 +676,7 @@ class HybridRecommendationEngine:
             print(f"Error scoring movie: {e}")
             return 0.0
     
-    def _extract_movie_features(self, movie: Dict) -> Dict:
+    def _extract_movie_features(self, movie: Dict, encode_content: bool = True) -> Dict:
         """Extract features from a movie"""
         # Genre vector
         genre_vector = np.zeros(len(self.genre_mapping))
@@ -680,12 +688,14 @@ class HybridRecommendationEngine:
             except ValueError:
                 continue
         
-        # Content embedding
-        text = f"{movie['title']}. {movie.get('overview', '')}"
-        try:
-            content_embedding = self.content_model.encode([text])[0]
-        except:
-            content_embedding = np.zeros(384)
+        # Content embedding (skipped when the caller already scored content in batch)
+        content_embedding = None
+        if encode_content:
+            text = f"{movie['title']}. {movie.get('overview', '')}"
+            try:
+                content_embedding = self.content_model.encode([text])[0]
+            except:
+                content_embedding = np.zeros(384)
         
         # Quality metrics
         quality_metrics = {
@@ -734,6 +744,23 @@ class HybridRecommendationEngine:
         
         return np.dot(movie_embedding, user_embedding) / norm_product
     
+    def _calculate_content_similarities(self, movies: List[Dict], user_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every movie's text embedding against the user's, 0.5 where undefined"""
+        similarities = np.full(len(movies), 0.5)
+        if not movies or np.sum(user_embedding) == 0:
+            return similarities
+        
+        texts = [f"{movie['title']}. {movie.get('overview', '')}" for movie in movies]
+        try:
+            embeddings = self.content_model.encode(texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False)
+        except Exception:
+            return similarities
+        
+        norm_products = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(user_embedding)
+        valid = (embeddings.sum(axis=1) != 0) & (norm_products > 0)
+        similarities[valid] = (embeddings[valid] @ user_embedding) / norm_products[valid]
+        return similarities
+    
     def _calculate_quality_match(self, movie_quality: Dict, user_quality: Dict) -> float:
         """Calculate quality preference match"""
         movie_rating = movie_quality['rating']
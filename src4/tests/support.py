@@ -0,0 +1,32 @@
+"""
+Service instances for tests: caches in a temporary directory and no network access.
+"""
+
+import atexit
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import firetv_integration_fixed
+from firetv_integration_fixed import CacheManager, FireTVRecommendationService
+
+
+def offline_service(test: unittest.TestCase) -> FireTVRecommendationService:
+    """A service whose caches live in a per-test temp dir and whose TMDB calls fail instead of going out"""
+    cache_dir = tempfile.TemporaryDirectory()
+    test.addCleanup(cache_dir.cleanup)
+
+    with mock.patch.object(firetv_integration_fixed, 'CacheManager',
+                           side_effect=lambda: CacheManager(cache_dir=cache_dir.name)):
+        service = FireTVRecommendationService({}, 'test-key')
+
+    cache_manager = service.cache_manager
+    test.addCleanup(atexit.unregister, cache_manager._save_caches)
+    cache_manager.session = mock.Mock()
+    cache_manager.session.get.side_effect = AssertionError("tests must not call TMDB")
+    service._try_fetch_tmdb_candidates = mock.Mock(return_value=[])
+    return service
@@ -0,0 +1,65 @@
+"""
+EmbeddingStore reads stay consistent while save() swaps in a new matrix generation
+(save also runs from the cache flush timer thread).
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from firetv_integration_fixed import EmbeddingStore
+
+
+def vector(seed: int) -> np.ndarray:
+    """Distinct direction per seed, so a row read through another key's index can't match"""
+    return np.eye(8, dtype=np.float32)[seed % 8] * seed
+
+
+class EmbeddingStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.store = EmbeddingStore(Path(cache_dir.name) / 'embeddings_index.json')
+
+    def test_saved_entries_round_trip(self):
+        for seed in range(1, 4):
+            self.store[seed] = {'data': vector(seed), 'timestamp': seed}
+        self.store.save()
+        for seed in range(1, 4):
+            np.testing.assert_allclose(self.store[seed]['data'], vector(seed), rtol=0.01)
+
+    def test_read_racing_a_save_returns_its_own_row(self):
+        for seed in range(1, 4):
+            self.store[seed] = {'data': vector(seed), 'timestamp': seed}
+        self.store.save()
+        # Re-adding key 1 moves it to the end of the next generation, shifting keys 2 and 3 up a row
+        self.store[1] = {'data': vector(1), 'timestamp': 10}
+        store = self.store
+        saver = threading.Thread(target=store.save)
+
+        class RowsThatYieldToSave(dict):
+            """Runs a save on another thread between the reader's row lookup and its matrix read"""
+            def __getitem__(self, key):
+                value = super().__getitem__(key)
+                saver.start()
+                saver.join(timeout=0.5)  # Blocks until save finishes unless reads hold the lock
+                return value
+
+        store.rows = RowsThatYieldToSave(store.rows)
+        try:
+            np.testing.assert_allclose(store[2]['data'], vector(2), rtol=0.01)
+        finally:
+            saver.join()
+        np.testing.assert_allclose(store[2]['data'], vector(2), rtol=0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+"""
+The curated fallback lists guarantee candidates when TMDB is unavailable, so every one of them
+must be a sequence of movie dicts.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from firetv_integration_fixed import EMERGENCY_FALLBACK_MOVIES, FALLBACK_MOVIES_BY_GENRE, _genre_mask
+
+
+class FallbackMoviesTest(unittest.TestCase):
+
+    def test_every_fallback_list_holds_movie_dicts(self):
+        for genre, movies in (*FALLBACK_MOVIES_BY_GENRE.items(), ('emergency', EMERGENCY_FALLBACK_MOVIES)):
+            with self.subTest(genre=genre):
+                self.assertIsInstance(movies, tuple)
+                self.assertTrue(movies)
+                for movie in movies:
+                    self.assertIsInstance(movie, dict)
+                    self.assertIn('tmdb_id', movie)
+                    self.assertIn('genres', movie)
+
+    def test_fallback_movies_carry_precomputed_scoring_fields(self):
+        for movies in (*FALLBACK_MOVIES_BY_GENRE.values(), EMERGENCY_FALLBACK_MOVIES):
+            for movie in movies:
+                with self.subTest(tmdb_id=movie['tmdb_id']):
+                    self.assertEqual(movie['_genre_mask'], _genre_mask(movie['genres']))
+                    self.assertEqual(movie['_text'], f"{movie['title']}. {movie['overview']}")
+
+
+if __name__ == '__main__':
+    unittest.main()
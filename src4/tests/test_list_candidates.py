@@ -0,0 +1,54 @@
+"""
+TMDB list pages are shared between profiles only within one refresh_all_profiles run,
+and failed or empty pages are never remembered.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from support import offline_service
+
+
+PAGE = ({'tmdb_id': 603, 'title': 'The Matrix'},)
+
+
+class ListCandidatesMemoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.service = offline_service(self)
+        self.fetch = mock.Mock(return_value=PAGE)
+        self.service._fetch_list_candidates = self.fetch
+
+    def test_outside_a_refresh_run_pages_are_not_memoized(self):
+        self.service._list_candidates('movie/popular', 1)
+        self.service._list_candidates('movie/popular', 1)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_pages_are_shared_within_a_refresh_run(self):
+        self.service._list_pages = {}
+        self.assertEqual(self.service._list_candidates('movie/popular', 1), PAGE)
+        self.assertEqual(self.service._list_candidates('movie/popular', 1), PAGE)
+        self.fetch.assert_called_once_with('movie/popular', 1, None)
+
+    def test_failed_and_empty_pages_are_refetched(self):
+        self.service._list_pages = {}
+        for result in (None, ()):
+            self.fetch.reset_mock()
+            self.fetch.return_value = result
+            self.service._list_candidates('discover/movie', 2, 28)
+            self.service._list_candidates('discover/movie', 2, 28)
+            self.assertEqual(self.fetch.call_count, 2)
+
+    def test_refresh_all_profiles_drops_the_pages_afterwards(self):
+        self.service._load_profile_state = mock.Mock(return_value=({}, b'state', False))
+        self.service._regenerate_profile = mock.Mock(return_value=True)
+        self.service.refresh_all_profiles()
+        self.assertIsNone(self.service._list_pages)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+Refresh-skip state across CLI processes: a dislike or incremental add run by one service
+instance must force the next refresh (run by another instance) to regenerate.
+"""
+
+import os
+import sys
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from firetv_integration_fixed import FireTVRecommendationService
+from support import offline_service
+
+
+class FakeDatabase:
+    """Just enough of Postgres for the recommendation_state bookkeeping; other statements are recorded"""
+
+    def __init__(self):
+        self.state = {}
+        self.statements = []
+
+
+class FakeCursor:
+    def __init__(self, db: FakeDatabase, connection):
+        self.db = db
+        self.connection = connection
+        self.rowcount = 1
+        self._row = None
+
+    def execute(self, sql, params=None):
+        statement = ' '.join(sql.split())
+        self.db.statements.append(statement)
+        if statement.startswith('SELECT state_hash FROM recommendation_state'):
+            stored = self.db.state.get(params[0])
+            self._row = (stored,) if stored is not None else None
+        elif statement.startswith('INSERT INTO recommendation_state'):
+            # psycopg2.Binary wraps the hash; .adapted is the raw bytes
+            self.db.state[params[0]] = bytes(getattr(params[1], 'adapted', params[1]))
+        elif statement.startswith('DELETE FROM recommendation_state'):
+            self.db.state.pop(params[0], None)
+
+    def fetchone(self):
+        return self._row
+
+
+class FakeConnection:
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+        self.prepared_statements = set()
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self.db, self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+USER_DATA = {
+    'user_id': 1,
+    'username': 'anshul',
+    'user_history': [550, 155],
+    'ratings': {550: 9.0},
+    'mood': 'happy',
+    'favourite_genres': ['Action', 'Thriller'],
+}
+
+RECOMMENDATIONS = [{
+    'tmdb_id': 603, 'title': 'The Matrix', 'genres': ['Action'], 'vote_average': 8.7,
+    'popularity': 93.8, 'overview': '', 'poster_path': '', 'similarity_score': 0.9,
+}]
+
+
+class RecommendationStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = FakeDatabase()
+        # What the database holds now vs. the copy in the (cross-process) user-data cache
+        self.live_user_data = dict(USER_DATA)
+        self.cached_user_data = dict(USER_DATA)
+
+    def new_service(self) -> FireTVRecommendationService:
+        """A fresh service instance, as the backend spawns one per CLI command"""
+        service = offline_service(self)
+
+        @contextmanager
+        def get_db_connection():
+            yield FakeConnection(self.db)
+
+        service.get_db_connection = get_db_connection
+        service.get_user_data_from_backend = mock.Mock(side_effect=lambda username, fresh=False: dict(
+            self.live_user_data if fresh else self.cached_user_data
+        ))
+        service.generate_recommendations = mock.Mock(return_value=list(RECOMMENDATIONS))
+        return service
+
+    def test_unchanged_state_skips_regeneration(self):
+        self.assertTrue(self.new_service().refresh_recommendations_for_profile('anshul'))
+
+        service = self.new_service()
+        self.assertTrue(service.refresh_recommendations_for_profile('anshul'))
+        service.generate_recommendations.assert_not_called()
+
+    def test_newly_watched_movie_forces_refresh_despite_cached_user_data(self):
+        self.assertTrue(self.new_service().refresh_recommendations_for_profile('anshul'))
+
+        self.live_user_data['user_history'] = [603, 550, 155]
+        service = self.new_service()
+        self.assertTrue(service.refresh_recommendations_for_profile('anshul'))
+        service.generate_recommendations.assert_called_once()
+
+    def test_dislike_in_another_process_forces_refresh(self):
+        self.assertTrue(self.new_service().refresh_recommendations_for_profile('anshul'))
+        self.assertIn('anshul', self.db.state)
+
+        self.assertTrue(self.new_service().handle_movie_dislike('anshul', 603))
+        self.assertNotIn('anshul', self.db.state)
+
+        service = self.new_service()
+        self.assertTrue(service.refresh_recommendations_for_profile('anshul'))
+        service.generate_recommendations.assert_called_once()
+
+    def test_incremental_add_in_another_process_forces_refresh(self):
+        self.assertTrue(self.new_service().refresh_recommendations_for_profile('anshul'))
+
+        adder = self.new_service()
+        self.assertTrue(adder.add_recommendations_to_profile('anshul', RECOMMENDATIONS))
+        self.assertNotIn('anshul', self.db.state)
+
+        service = self.new_service()
+        self.assertTrue(service.refresh_recommendations_for_profile('anshul'))
+        service.generate_recommendations.assert_called_once()
+
+    def test_refresh_all_skips_tmdb_when_every_profile_is_unchanged(self):
+        self.new_service().refresh_all_profiles()
+
+        service = self.new_service()
+        results = service.refresh_all_profiles()
+        self.assertTrue(all(results.values()))
+        service._try_fetch_tmdb_candidates.assert_not_called()
+        service.generate_recommendations.assert_not_called()
+
+    def test_refresh_all_prewarms_only_stale_profiles(self):
+        self.new_service().refresh_all_profiles()
+        self.db.state.pop('anshul')
+
+        service = self.new_service()
+        service.refresh_all_profiles()
+        service._try_fetch_tmdb_candidates.assert_called_once_with(
+            service.profile_configs['anshul']['_genre_ids'], set(), target=sys.maxsize
+        )
+        service.generate_recommendations.assert_called_once()
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+"""
+TokenBucket pacing settings that would otherwise hang or divide by zero.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from firetv_integration_fixed import TokenBucket
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_zero_capacity_still_hands_out_tokens(self):
+        bucket = TokenBucket(rate=0.5, capacity=0)
+        self.assertEqual(bucket.capacity, 1)
+        bucket.acquire()
+
+    def test_non_positive_rate_is_rejected(self):
+        for rate in (0, -1.0):
+            with self.subTest(rate=rate):
+                with self.assertRaises(ValueError):
+                    TokenBucket(rate=rate, capacity=40)
+
+
+if __name__ == '__main__':
+    unittest.main()